@@ -1,29 +1,121 @@
-from database import get_connection
-from langchain_ollama import OllamaLLM
+from database import db_connection, stream_query
+from llm_gateway import invoke, stream
+from prompt_builder import build_prompt, render_mapping
+from agents.kpi_engine import analyze_items, overall_trend_percent
+
+import config
+import metrics
+
+
+def refresh_production_rollup(since=None):
+    """Recompute production_daily_rollup from production_log
+
+    Without since, the last ANALYST_ROLLUP_REFRESH_DAYS days are recomputed
+    (from the latest rolled-up date if that is older), so rows logged late
+    for recent days are picked up while the cost still tracks a few days
+    of log rows. An empty rollup is backfilled in full. Pass since (a date)
+    to recompute further back. The table comes from migrations.py.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            cur.execute("""
+                SELECT COALESCE(%s::date, CASE
+                    WHEN MAX(production_date) IS NULL THEN '-infinity'::date
+                    ELSE LEAST(MAX(production_date), CURRENT_DATE - %s + 1)
+                END)
+                FROM production_daily_rollup;
+            """, (since, config.ANALYST_ROLLUP_REFRESH_DAYS))
+
+            start_date = cur.fetchone()[0]
+
+            # Replace the days outright, so rows deleted from the log drop out too
+            cur.execute("DELETE FROM production_daily_rollup WHERE production_date >= %s;", (start_date,))
+            cur.execute("""
+                INSERT INTO production_daily_rollup
+                    (production_date, item_name, units_produced, units_scrapped,
+                     machine_hours, downtime_minutes, refreshed_at)
+                SELECT production_date, item_name,
+                       SUM(units_produced), SUM(units_scrapped),
+                       SUM(machine_hours), SUM(downtime_minutes), NOW()
+                FROM production_log
+                WHERE production_date >= %s
+                GROUP BY production_date, item_name
+                ON CONFLICT (production_date, item_name) DO UPDATE
+                SET units_produced = EXCLUDED.units_produced,
+                    units_scrapped = EXCLUDED.units_scrapped,
+                    machine_hours = EXCLUDED.machine_hours,
+                    downtime_minutes = EXCLUDED.downtime_minutes,
+                    refreshed_at = EXCLUDED.refreshed_at;
+            """, (start_date,))
+
+            conn.commit()
+        except Exception as e:
+            print(f"Error refreshing production rollup: {e}")
+            conn.rollback()
+        finally:
+            cur.close()
+
+
+def fetch_production_window(days=7):
+    """Per date x item rollup rows for the last `days` days, same shape as production_log"""
+    refresh_production_rollup()
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        cur.execute("""
+            SELECT production_date, item_name, units_produced, units_scrapped,
+                   machine_hours, downtime_minutes
+            FROM production_daily_rollup
+            WHERE production_date >= CURRENT_DATE - (%s - 1) * INTERVAL '1 day'
+            ORDER BY production_date, item_name;
+        """, (days,))
+
+        rows = cur.fetchall()
+        cur.close()
+
+    return rows
 
 
 def fetch_last_7_days_production():
-    conn = get_connection()
-    cur = conn.cursor()
+    return fetch_production_window(7)
 
-    cur.execute("""
+
+def iter_production_log(days=7, itersize=None):
+    """Stream raw production_log rows for the window through a server-side cursor"""
+    return stream_query("""
         SELECT production_date, item_name, units_produced, units_scrapped,
                machine_hours, downtime_minutes
         FROM production_log
-        WHERE production_date >= CURRENT_DATE - INTERVAL '6 days';
-    """)
+        WHERE production_date >= CURRENT_DATE - (%s - 1) * INTERVAL '1 day';
+    """, (days,), itersize=itersize)
 
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
 
-    return rows
+def sum_by_day_and_item(rows):
+    """Collapse production_log rows to one row per (date, item), like the rollup"""
+    totals = {}
+
+    for production_date, item_name, produced, scrapped, hours, downtime in rows:
+        current = totals.get((production_date, item_name), (0, 0, 0, 0))
+        totals[(production_date, item_name)] = (
+            current[0] + produced, current[1] + scrapped, current[2] + hours, current[3] + downtime
+        )
+
+    return [key + value for key, value in sorted(totals.items())]
 
 
 def calculate_kpis(rows):
-    total_produced = sum(r[2] for r in rows)
-    total_scrap = sum(r[3] for r in rows)
-    total_downtime = sum(r[5] for r in rows)
+    # Single pass, so rows can be a streaming generator
+    total_produced = 0
+    total_scrap = 0
+    total_downtime = 0
+
+    for r in rows:
+        total_produced += r[2]
+        total_scrap += r[3]
+        total_downtime += r[5]
 
     scrap_rate = (total_scrap / total_produced) * 100 if total_produced else 0
 
@@ -36,45 +128,78 @@ def calculate_kpis(rows):
 
 
 def detect_trend(rows):
-    first_day = rows[0][2]
-    last_day = rows[-1][2]
-
-    percent_change = ((last_day - first_day) / first_day) * 100 if first_day else 0
+    # Least-squares fit over daily totals, independent of row order
+    return overall_trend_percent(rows)
 
-    return round(percent_change, 2)
 
-
-def generate_executive_summary(kpis, trend):
-    llm = OllamaLLM(model="llama3")
-
-    prompt = f"""
+def _executive_summary_prompt(kpis, trend, items_out_of_control=()):
+    return build_prompt("executive_summary", """
 You are an operations analytics advisor.
 
 KPIs:
 {kpis}
 
-Production growth over last 7 days: {trend}%
+Production growth over the last {window_days} days: {trend}%
+
+Items with scrap rate above the 3-sigma control limit ({out_of_control_count} total, worst first):
+{out_of_control}
 
 Write a concise executive summary.
 If growth exceeds 15%, recommend raising reorder levels.
 If scrap rate exceeds 5%, recommend quality review.
-"""
+""",
+        # A table, so the item list is trimmed to the family's token budget
+        tables={"out_of_control": items_out_of_control},
+        columns={"out_of_control": ["item_name", "scrap_rate_percent", "scrap_upper_limit_percent"]},
+        kpis=render_mapping(kpis),
+        trend=trend,
+        window_days=config.ANALYST_WINDOW_DAYS,
+        out_of_control_count=len(items_out_of_control)
+    )
+
 
-    return llm.invoke(prompt)
+def generate_executive_summary(kpis, trend, items_out_of_control=()):
+    prompt = _executive_summary_prompt(kpis, trend, items_out_of_control)
+    return invoke(prompt, family="executive_summary")
 
 
-def run_analysis_cycle():
-    rows = fetch_last_7_days_production()
+def stream_executive_summary(kpis, trend, items_out_of_control=()):
+    prompt = _executive_summary_prompt(kpis, trend, items_out_of_control)
+    return stream(prompt, family="executive_summary")
+
+
+@metrics.timed_cycle("analyst")
+def run_analysis_cycle(live=None):
+    if config.ANALYST_AGGREGATE_MODE:
+        # The date x item rollup is summed in Postgres
+        rows = fetch_production_window(config.ANALYST_WINDOW_DAYS)
+    else:
+        # Stream the raw log and sum it here; memory grows with items x days,
+        # not with the size of the log
+        rows = sum_by_day_and_item(iter_production_log(config.ANALYST_WINDOW_DAYS))
 
     if not rows:
         return None
 
+    # KPIs, trend and item analysis all come from the same rows
     kpis = calculate_kpis(rows)
     trend = detect_trend(rows)
-    summary = generate_executive_summary(kpis, trend)
+
+    item_analysis = analyze_items(rows)
+    out_of_control = sorted(
+        (item for item in item_analysis["items"] if item["scrap_out_of_control"]),
+        key=lambda item: item["scrap_rate_percent"] - item["scrap_upper_limit_percent"],
+        reverse=True
+    )
+
+    if live is None:
+        summary = generate_executive_summary(kpis, trend, out_of_control)
+    else:
+        summary = live.collect("analyst_summary", stream_executive_summary(kpis, trend, out_of_control))
 
     return {
         "trend_percent": trend,
         "scrap_rate": kpis["scrap_rate_percent"],
+        "item_analysis": item_analysis,
         "summary": summary
     }
\ No newline at end of file
@@ -0,0 +1,176 @@
+import numpy as np
+
+
+def load_production_arrays(rows):
+    """Columnar view of (date, item, produced, scrapped, machine_hours, downtime) rows"""
+    rows = list(rows)
+
+    if not rows:
+        return None
+
+    dates, items, produced, scrapped, hours, downtime = zip(*rows)
+
+    day_values, day_index = np.unique(np.array(dates, dtype="datetime64[D]"), return_inverse=True)
+    item_values, item_index = np.unique(np.array(items, dtype=object), return_inverse=True)
+
+    return {
+        "days": day_values,
+        "day_index": day_index,
+        "items": item_values,
+        "item_index": item_index,
+        "produced": np.asarray(produced, dtype=float),
+        "scrapped": np.asarray(scrapped, dtype=float),
+        "machine_hours": np.asarray(hours, dtype=float),
+        "downtime": np.asarray(downtime, dtype=float),
+    }
+
+
+def item_day_matrix(arrays, column):
+    """items x days matrix of a column, summed over duplicate rows"""
+    n_items, n_days = len(arrays["items"]), len(arrays["days"])
+    flat = arrays["item_index"] * n_days + arrays["day_index"]
+
+    return np.bincount(flat, weights=arrays[column], minlength=n_items * n_days).reshape(n_items, n_days)
+
+
+def day_offsets(days):
+    """Days elapsed since the first of a sorted datetime64[D] array"""
+    return (days - days[0]).astype("timedelta64[D]").astype(float)
+
+
+def _regressor(matrix, x):
+    # Columns are assumed one day apart unless their day offsets are given
+    return np.arange(matrix.shape[1], dtype=float) if x is None else np.asarray(x, dtype=float)
+
+
+def least_squares_slopes(matrix, x=None):
+    """Slope of each row per day, fitted in one vectorized pass
+
+    x holds the day offset of each column, so gaps in the dates (weekends,
+    shutdowns) stretch the fit instead of being treated as consecutive days.
+    """
+    x = _regressor(matrix, x)
+    x_centered = x - x.mean()
+    denominator = (x_centered ** 2).sum()
+
+    if denominator == 0:
+        return np.zeros(matrix.shape[0])
+
+    y_centered = matrix - matrix.mean(axis=1, keepdims=True)
+    return (y_centered @ x_centered) / denominator
+
+
+def fitted_percent_change(matrix, x=None):
+    """Percent change between the fitted first and last day of each row"""
+    x = _regressor(matrix, x)
+    slopes = least_squares_slopes(matrix, x)
+
+    means = matrix.mean(axis=1)
+    first = means + slopes * (x[0] - x.mean())
+    last = means + slopes * (x[-1] - x.mean())
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(first > 0, (last - first) / first * 100, 0.0)
+
+    return change
+
+
+def rolling_average(matrix, window=3):
+    """Trailing rolling mean along the day axis (shorter windows at the start)"""
+    cumulative = np.cumsum(matrix, axis=1)
+    shifted = np.zeros_like(cumulative)
+    shifted[:, window:] = cumulative[:, :-window]
+
+    counts = np.minimum(np.arange(1, matrix.shape[1] + 1), window)
+    return (cumulative - shifted) / counts
+
+
+def scrap_control_limits(produced, scrapped):
+    """p-chart centre line and per-item 3-sigma upper limits for scrap rate"""
+    total_produced = produced.sum()
+    p_bar = scrapped.sum() / total_produced if total_produced else 0.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma = np.sqrt(p_bar * (1 - p_bar) / produced)
+        rates = np.where(produced > 0, scrapped / produced, 0.0)
+
+    upper = np.where(produced > 0, p_bar + 3 * sigma, np.inf)
+    return p_bar, rates, upper
+
+
+def analyze_items(rows, rolling_window=3):
+    """Per-item KPIs, trend slopes, rolling averages and scrap control flags"""
+    arrays = load_production_arrays(rows)
+
+    if arrays is None:
+        return None
+
+    produced = item_day_matrix(arrays, "produced")
+    scrapped = item_day_matrix(arrays, "scrapped")
+    hours = item_day_matrix(arrays, "machine_hours")
+    downtime = item_day_matrix(arrays, "downtime")
+
+    produced_totals = produced.sum(axis=1)
+    hours_totals = hours.sum(axis=1)
+
+    offsets = day_offsets(arrays["days"])
+    slopes = least_squares_slopes(produced, offsets)
+    changes = fitted_percent_change(produced, offsets)
+    rolling = rolling_average(produced, rolling_window)[:, -1]
+    p_bar, scrap_rates, upper_limits = scrap_control_limits(produced_totals, scrapped.sum(axis=1))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        units_per_hour = np.where(hours_totals > 0, produced_totals / hours_totals, 0.0)
+
+    out_of_control = scrap_rates > upper_limits
+
+    items = [
+        {
+            "item_name": arrays["items"][i],
+            "total_produced": int(produced_totals[i]),
+            "scrap_rate_percent": round(float(scrap_rates[i]) * 100, 2),
+            # No production means no control limit; None keeps the output valid JSON
+            "scrap_upper_limit_percent": (
+                round(float(upper_limits[i]) * 100, 2) if np.isfinite(upper_limits[i]) else None
+            ),
+            "scrap_out_of_control": bool(out_of_control[i]),
+            "downtime_minutes": int(downtime[i].sum()),
+            "units_per_machine_hour": round(float(units_per_hour[i]), 2),
+            "trend_slope_units_per_day": round(float(slopes[i]), 2),
+            "trend_percent": round(float(changes[i]), 2),
+            "rolling_avg_units": round(float(rolling[i]), 2),
+        }
+        for i in range(len(arrays["items"]))
+    ]
+
+    return {
+        "days": len(arrays["days"]),
+        "scrap_center_line_percent": round(float(p_bar) * 100, 2),
+        "items": items,
+        "items_out_of_control": [item["item_name"] for item in items if item["scrap_out_of_control"]],
+    }
+
+
+def daily_trend_percent(daily_totals, offsets=None):
+    """Fitted percent change across a date-ordered sequence of daily totals
+
+    offsets are the day offsets of the totals; without them the totals are
+    taken to be consecutive days.
+    """
+    daily = np.asarray(daily_totals, dtype=float).reshape(1, -1)
+
+    if daily.shape[1] == 0:
+        return 0.0
+
+    return round(float(fitted_percent_change(daily, offsets)[0]), 2)
+
+
+def overall_trend_percent(rows):
+    """Fitted percent change of total daily production across all items"""
+    arrays = load_production_arrays(rows)
+
+    if arrays is None:
+        return 0.0
+
+    daily = np.bincount(arrays["day_index"], weights=arrays["produced"], minlength=len(arrays["days"]))
+    return daily_trend_percent(daily, day_offsets(arrays["days"]))
@@ -1,67 +1,205 @@
-from database import get_connection
-from langchain_ollama import OllamaLLM
+from database import db_connection, explain_analyze, stream_query
+from llm_gateway import invoke, stream
+from itertools import chain
+from agents.risk_engine import top_shipment_risks
+from prompt_builder import build_prompt, render_mapping
 
+import config
+import metrics
 
-def fetch_shipments():
-    conn = get_connection()
-    cur = conn.cursor()
 
-    cur.execute("""
+def _rows_scanned(plan):
+    """Rows read by the table and index scans in an EXPLAIN ANALYZE plan"""
+    scanned = 0
+    nodes = [plan["Plan"]]
+
+    while nodes:
+        node = nodes.pop()
+
+        # Bitmap index scans carry no relation; their heap scan counts the rows
+        if "Relation Name" in node:
+            read = node["Actual Rows"] + node.get("Rows Removed by Filter", 0) \
+                + node.get("Rows Removed by Index Recheck", 0)
+            scanned += read * node["Actual Loops"]
+
+        nodes.extend(node.get("Plans", []))
+
+    return scanned
+
+
+def iter_open_shipments(horizon_days=None, item_names=None, scan_stats=None, itersize=None):
+    """Stream only non-delivered shipments, served by a partial index on status
+
+    horizon_days limits to shipments expected within that many days and
+    item_names to those items. If scan_stats is a dict it is filled with
+    rows_returned and, from an EXPLAIN ANALYZE run of the same query,
+    rows_scanned and shared_buffers. That runs the query twice, so pass
+    scan_stats only when the numbers are wanted.
+    """
+    conditions = ["status <> 'Delivered'"]
+    params = []
+
+    if horizon_days is not None:
+        conditions.append("expected_arrival <= CURRENT_DATE + %s * INTERVAL '1 day'")
+        params.append(horizon_days)
+
+    if item_names:
+        conditions.append("item_name = ANY(%s)")
+        params.append(list(item_names))
+
+    sql = f"""
         SELECT item_name, expected_arrival, quantity, carrier, status
-        FROM shipment_schedule;
-    """)
+        FROM shipment_schedule
+        WHERE {" AND ".join(conditions)}
+        ORDER BY expected_arrival
+    """
+    rows = stream_query(sql, params, itersize=itersize)
 
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    if scan_stats is not None:
+        scan_stats["rows_returned"] = 0
 
-    return rows
+        try:
+            plan = explain_analyze(sql, params)
+            scan_stats["rows_scanned"] = _rows_scanned(plan)
+            scan_stats["shared_buffers"] = plan["Plan"].get("Shared Hit Blocks", 0) \
+                + plan["Plan"].get("Shared Read Blocks", 0)
+        except Exception as e:
+            print(f"Error measuring open shipment scan: {e}")
 
+    for row in rows:
+        if scan_stats is not None:
+            scan_stats["rows_returned"] += 1
+        yield row
 
-def assess_logistics_risk(shipments):
-    risk_flags = []
 
+def assess_logistics_risk(shipments):
+    """Flag each open shipment, lazily, so the stream is never held in memory"""
     for shipment in shipments:
         item_name, arrival, quantity, carrier, status = shipment
 
         if status != "Delivered":
-            risk_flags.append({
+            yield {
                 "item_name": item_name,
                 "arrival_date": str(arrival),
+                "expected_arrival": arrival,
+                "quantity": quantity,
                 "carrier": carrier,
                 "status": status
-            })
-
-    return risk_flags
-
-
-def generate_logistics_report(risks):
-    llm = OllamaLLM(model="llama3")
-
-    prompt = f"""
+            }
+
+
+def fetch_risk_context(item_names=None):
+    """Stock position per item and overdue history per carrier for risk scoring
+
+    Without item_names, stock is loaded for every item with an open shipment.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        if item_names:
+            cur.execute("""
+                SELECT item_name, current_stock, reorder_level
+                FROM inventory
+                WHERE item_name = ANY(%s);
+            """, (list(item_names),))
+        else:
+            cur.execute("""
+                SELECT item_name, current_stock, reorder_level
+                FROM inventory
+                WHERE item_name IN (
+                    SELECT item_name FROM shipment_schedule WHERE status <> 'Delivered'
+                );
+            """)
+        stock_by_item = {row[0]: (row[1], row[2]) for row in cur.fetchall()}
+
+        cur.execute("""
+            SELECT carrier,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE expected_arrival < CURRENT_DATE)
+            FROM shipment_schedule
+            WHERE status <> 'Delivered'
+            GROUP BY carrier;
+        """)
+        carrier_history = {row[0]: {"shipments": row[1], "overdue": row[2]} for row in cur.fetchall()}
+
+        cur.close()
+
+    return stock_by_item, carrier_history
+
+
+def prioritize_risks(risk_flags, top_n=None, item_names=None):
+    """Keep the top_n flagged shipments plus statistics over all of them
+
+    risk_flags may be a stream; it is scored in one pass without being
+    collected, so the context is fetched up front for item_names (or every
+    item in transit) rather than for the flags themselves.
+    """
+    stock_by_item, carrier_history = fetch_risk_context(item_names)
+
+    return top_shipment_risks(
+        risk_flags, stock_by_item, carrier_history, top_n or config.LOGISTICS_REPORT_TOP_N
+    )
+
+
+def _logistics_report_prompt(risks, risk_stats=None):
+    # Only the highest-risk shipments reach the prompt; the rest are
+    # represented by risk_stats so prompt size stays bounded
+    return build_prompt("logistics_report", """
 You are a logistics operations coordinator.
 
-The following shipments are currently in transit:
+Overall in-transit statistics:
+{risk_stats}
+
+Highest-risk shipments currently in transit (scored 0-100):
 
-{risks}
+{shipments}
 
 Assess if there are potential delivery risks.
 If delay could impact production, recommend mitigation strategies 
 such as expediting shipment or alternative sourcing.
 
 Provide a concise operational report.
-"""
+""",
+        tables={"shipments": risks},
+        columns={"shipments": [
+            "item_name", "arrival_date", "quantity", "carrier", "status", "days_late", "risk_score"
+        ]},
+        risk_stats=render_mapping(risk_stats) if risk_stats else "Not available"
+    )
+
 
-    return llm.invoke(prompt)
+def generate_logistics_report(risks, risk_stats=None):
+    prompt = _logistics_report_prompt(risks, risk_stats)
+    return invoke(prompt, family="logistics_report")
 
 
-def run_logistics_cycle():
-    shipments = fetch_shipments()
+def stream_logistics_report(risks, risk_stats=None):
+    prompt = _logistics_report_prompt(risks, risk_stats)
+    return stream(prompt, family="logistics_report")
 
-    if not shipments:
-        return "No shipment data available."
+
+@metrics.timed_cycle("logistics")
+def run_logistics_cycle(horizon_days=None, item_names=None, scan_stats=None, live=None):
+    shipments = iter_open_shipments(
+        horizon_days=horizon_days or config.LOGISTICS_HORIZON_DAYS,
+        item_names=item_names,
+        scan_stats=scan_stats
+    )
+
+    # Peek at the stream instead of materializing it to test for emptiness
+    first = next(shipments, None)
+
+    if first is None:
+        return "No open shipments in transit."
+
+    shipments = chain([first], shipments)
 
     risks = assess_logistics_risk(shipments)
-    report = generate_logistics_report(risks)
+    top_risks, risk_stats = prioritize_risks(risks, item_names=item_names)
+
+    if live is None:
+        report = generate_logistics_report(top_risks, risk_stats)
+    else:
+        report = live.collect("logistics_report", stream_logistics_report(top_risks, risk_stats))
 
     return report
\ No newline at end of file
@@ -1,35 +1,28 @@
-from database import get_connection
-from langchain_ollama import OllamaLLM
+from database import db_connection
+from audit_log import log_decision
+from llm_gateway import invoke, stream
+from prompt_builder import build_prompt, render_table
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
-
-def log_decision(agent_name, decision_summary, confidence_score, human_approved=False):
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
-        INSERT INTO ai_decision_log (agent_name, decision_summary, confidence_score, human_approved)
-        VALUES (%s, %s, %s, %s);
-    """, (agent_name, decision_summary, confidence_score, human_approved))
-
-    conn.commit()
-    cur.close()
-    conn.close()
+import config
+import metrics
+import profiling
+import tracing
 
 
 def get_low_stock_items():
-    conn = get_connection()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
 
-    cur.execute("""
-        SELECT item_name, current_stock, reorder_level, vendor_email, unit_price
-        FROM inventory
-        WHERE current_stock < reorder_level;
-    """)
+        cur.execute("""
+            SELECT item_name, current_stock, reorder_level, vendor_email, unit_price
+            FROM inventory
+            WHERE current_stock < reorder_level;
+        """)
 
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+        rows = cur.fetchall()
+        cur.close()
 
     return rows
 
@@ -64,10 +57,9 @@ def calculate_and_group_by_vendor(rows, trend_percent=0):
     return vendor_map
 
 
-def generate_vendor_email(vendor_email, items):
-    llm = OllamaLLM(model="llama3")
-
-    prompt = f"""
+def _vendor_email_prompt(vendor_email, items):
+    # Every item must appear on the PO, so the item table is never trimmed
+    return build_prompt("vendor_po", """
 You are a professional procurement manager.
 
 Generate ONE clean purchase order email to {vendor_email}.
@@ -80,13 +72,44 @@ Rules:
 
 Items to order:
 {items}
-"""
+""",
+        vendor_email=vendor_email,
+        items=render_table(items)
+    )
 
-    response = llm.invoke(prompt)
+
+def generate_vendor_email(vendor_email, items):
+    prompt = _vendor_email_prompt(vendor_email, items)
+    response = invoke(prompt, family="vendor_po")
     return response
 
 
-def run_procurement_cycle(trend_percent=0):
+def stream_vendor_email(vendor_email, items):
+    prompt = _vendor_email_prompt(vendor_email, items)
+    return stream(prompt, family="vendor_po")
+
+
+def process_vendor_order(vendor_email, items, live=None):
+    with tracing.span("procurement.vendor_order", {"vendor": vendor_email, "items": len(items)}):
+        if live is None:
+            email_content = generate_vendor_email(vendor_email, items)
+        else:
+            email_content = live.collect(f"procurement/{vendor_email}", stream_vendor_email(vendor_email, items))
+
+    total_value = sum(i['total_cost'] for i in items)
+
+    log_decision(
+        agent_name="Procurement Agent",
+        decision_summary=f"PO generated for {vendor_email} with {len(items)} items totaling ${total_value:.2f}",
+        confidence_score=0.95,
+        human_approved=False
+    )
+
+    return email_content
+
+
+@metrics.timed_cycle("procurement")
+def run_procurement_cycle(trend_percent=0, max_concurrency=None, live=None):
     low_items = get_low_stock_items()
 
     if not low_items:
@@ -96,18 +119,27 @@ def run_procurement_cycle(trend_percent=0):
 
     vendor_emails_output = {}
 
-    for vendor_email, items in vendor_map.items():
-        email_content = generate_vendor_email(vendor_email, items)
-
-        total_value = sum(i['total_cost'] for i in items)
-
-        log_decision(
-            agent_name="Procurement Agent",
-            decision_summary=f"PO generated for {vendor_email} with {len(items)} items totaling ${total_value:.2f}",
-            confidence_score=0.95,
-            human_approved=False
-        )
-
-        vendor_emails_output[vendor_email] = email_content
-
-    return vendor_emails_output
\ No newline at end of file
+    if not vendor_map:
+        return vendor_emails_output
+
+    # Bounded fan-out: at most max_concurrency LLM requests in flight
+    max_workers = min(max_concurrency or config.LLM_MAX_CONCURRENCY, len(vendor_map))
+
+    # Worker threads keep the caller's trace parent and profiled agent
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        futures = {
+            vendor_email: executor.submit(
+                tracing.propagate(profiling.inherit(process_vendor_order)), vendor_email, items, live
+            )
+            for vendor_email, items in vendor_map.items()
+        }
+
+        # Collect in vendor_map order so output ordering stays stable
+        for vendor_email, future in futures.items():
+            try:
+                vendor_emails_output[vendor_email] = future.result()
+            except Exception as e:
+                # One failing vendor must not sink the rest of the cycle
+                print(f"Error generating purchase order for {vendor_email}: {e}")
+
+    return vendor_emails_output
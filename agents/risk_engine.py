@@ -0,0 +1,128 @@
+import datetime
+import heapq
+
+# Weights of each factor in the 0-100 risk score
+LATENESS_WEIGHT = 50
+CARRIER_WEIGHT = 20
+STOCK_WEIGHT = 30
+
+# A shipment this many days late gets the full lateness weight
+MAX_DAYS_LATE = 7
+
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value[:10])
+    return value
+
+
+def score_shipment(flag, stock, carrier_stats, today):
+    """Deterministic 0-100 risk score for one open shipment"""
+    arrival = _as_date(flag["expected_arrival"])
+    days_late = (today - arrival).days if arrival else 0
+    lateness = min(max(days_late, 0) / MAX_DAYS_LATE, 1.0)
+
+    # Share of this carrier's open shipments already past their arrival date
+    carrier_rate = 0.0
+    if carrier_stats and carrier_stats["shipments"]:
+        carrier_rate = carrier_stats["overdue"] / carrier_stats["shipments"]
+
+    # How much of the item's stock position depends on this shipment
+    exposure = 0.5
+    if stock:
+        current_stock, reorder_level = stock
+        quantity = flag.get("quantity") or 0
+        exposure = min(quantity / max(current_stock, 1), 1.0)
+        if current_stock < reorder_level:
+            exposure = min(exposure + 0.5, 1.0)
+
+    score = lateness * LATENESS_WEIGHT + carrier_rate * CARRIER_WEIGHT + exposure * STOCK_WEIGHT
+
+    return {
+        **flag,
+        "arrival_date": str(arrival),
+        "days_late": max(days_late, 0),
+        "carrier_overdue_rate": round(carrier_rate, 2),
+        "stock_exposure": round(exposure, 2),
+        "risk_score": round(score, 1)
+    }
+
+
+def _risk_score(scored):
+    return scored["risk_score"]
+
+
+def rank_shipment_risks(risk_flags, stock_by_item, carrier_history, today=None):
+    """Score every flagged shipment and return them highest risk first"""
+    today = today or datetime.date.today()
+
+    scored = [
+        score_shipment(flag, stock_by_item.get(flag["item_name"]), carrier_history.get(flag["carrier"]), today)
+        for flag in risk_flags
+    ]
+
+    scored.sort(key=_risk_score, reverse=True)
+    return scored
+
+
+def _new_totals():
+    return {"open": 0, "late": 0, "high_risk": 0, "quantity": 0, "quantity_late": 0, "days_late": 0, "max_score": 0}
+
+
+def _add_to_totals(totals, scored, high_risk_threshold):
+    quantity = scored.get("quantity") or 0
+
+    totals["open"] += 1
+    totals["quantity"] += quantity
+    totals["max_score"] = max(totals["max_score"], scored["risk_score"])
+
+    if scored["risk_score"] >= high_risk_threshold:
+        totals["high_risk"] += 1
+
+    if scored["days_late"] > 0:
+        totals["late"] += 1
+        totals["quantity_late"] += quantity
+        totals["days_late"] += scored["days_late"]
+
+
+def _summary(totals):
+    return {
+        "open_shipments": totals["open"],
+        "late_shipments": totals["late"],
+        "high_risk_shipments": totals["high_risk"],
+        "quantity_in_transit": totals["quantity"],
+        "quantity_late": totals["quantity_late"],
+        "avg_days_late": round(totals["days_late"] / totals["late"], 1) if totals["late"] else 0,
+        "max_risk_score": totals["max_score"]
+    }
+
+
+def summarize_risks(scored, high_risk_threshold=60):
+    """Aggregate statistics over all scored shipments, in any order"""
+    totals = _new_totals()
+
+    for s in scored:
+        _add_to_totals(totals, s, high_risk_threshold)
+
+    return _summary(totals)
+
+
+def top_shipment_risks(risk_flags, stock_by_item, carrier_history, top_n, today=None, high_risk_threshold=60):
+    """Highest-risk top_n shipments plus summarize_risks statistics over all of them
+
+    risk_flags is consumed once as a stream: statistics are kept as running
+    totals and only top_n scored shipments are held, in a heap.
+    """
+    today = today or datetime.date.today()
+    totals = _new_totals()
+
+    def scored():
+        for flag in risk_flags:
+            s = score_shipment(flag, stock_by_item.get(flag["item_name"]), carrier_history.get(flag["carrier"]), today)
+            _add_to_totals(totals, s, high_risk_threshold)
+            yield s
+
+    top = heapq.nlargest(top_n, scored(), key=_risk_score)
+    return top, _summary(totals)
@@ -0,0 +1,134 @@
+import atexit
+import threading
+
+from psycopg2.extras import execute_values
+
+import config
+from database import db_connection
+
+_pending = []
+_pending_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_stop = threading.Event()
+_worker = None
+_sync = config.AUDIT_LOG_SYNC
+
+
+def insert_decision_rows(cur, decisions):
+    """Insert (agent_name, decision_summary, confidence_score, human_approved) rows in one statement"""
+    execute_values(cur, """
+        INSERT INTO ai_decision_log (agent_name, decision_summary, confidence_score, human_approved)
+        VALUES %s;
+    """, decisions)
+
+
+def write_decisions(decisions):
+    """Write a batch of decision rows in one transaction; returns True on success"""
+    if not decisions:
+        return True
+
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+
+            try:
+                insert_decision_rows(cur, decisions)
+                conn.commit()
+                return True
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+    except Exception as e:
+        # Includes pool/connect failures, so callers can always re-queue
+        print(f"Error writing decision log batch: {e}")
+        return False
+
+
+def _trim_pending():
+    """Drop the oldest rows beyond AUDIT_LOG_MAX_PENDING; call with _pending_lock held"""
+    overflow = len(_pending) - config.AUDIT_LOG_MAX_PENDING
+
+    if overflow > 0:
+        del _pending[:overflow]
+        print(f"Decision log backlog full: dropped {overflow} oldest entries")
+
+
+def flush():
+    """Write every queued decision now"""
+    with _flush_lock:
+        with _pending_lock:
+            batch = _pending[:]
+            del _pending[:]
+
+        if not write_decisions(batch):
+            # Keep the rows for the next flush rather than dropping audit entries
+            with _pending_lock:
+                _pending[:0] = batch
+                _trim_pending()
+
+
+def _run_worker():
+    while not _stop.is_set():
+        _wake.wait(config.AUDIT_LOG_FLUSH_INTERVAL_SECONDS)
+        _wake.clear()
+
+        try:
+            flush()
+        except Exception as e:
+            # The writer must outlive any single failed batch
+            print(f"Error flushing decision log: {e}")
+
+
+def _ensure_worker():
+    global _worker
+
+    if _worker is None or not _worker.is_alive():
+        with _pending_lock:
+            if (_worker is None or not _worker.is_alive()) and not _stop.is_set():
+                _worker = threading.Thread(target=_run_worker, name="audit-log-writer", daemon=True)
+                _worker.start()
+
+
+def set_sync_mode(enabled):
+    """Write each decision immediately instead of batching (used by tests)"""
+    global _sync
+
+    if enabled:
+        flush()
+    _sync = enabled
+
+
+def log_decision(agent_name, decision_summary, confidence_score, human_approved=False):
+    """Queue a decision for the ai_decision_log batch writer"""
+    row = (agent_name, decision_summary, confidence_score, human_approved)
+
+    if _sync:
+        write_decisions([row])
+        return
+
+    with _pending_lock:
+        _pending.append(row)
+        _trim_pending()
+        full = len(_pending) >= config.AUDIT_LOG_BATCH_SIZE
+
+    _ensure_worker()
+
+    if full:
+        _wake.set()
+
+
+def shutdown():
+    """Stop the background writer and flush whatever is still queued"""
+    _stop.set()
+    _wake.set()
+
+    if _worker is not None:
+        _worker.join(timeout=config.AUDIT_LOG_FLUSH_INTERVAL_SECONDS + 5)
+
+    flush()
+
+
+atexit.register(shutdown)
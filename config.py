@@ -0,0 +1,122 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Database configuration
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_NAME = os.getenv("DB_NAME", "operations-ai")
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_PORT = os.getenv("DB_PORT", "5432")
+
+# Connection pool sizing
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+
+# LLM configuration
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 300))
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", 4))  # match the Ollama server setting
+
+# LLM response cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 512))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")  # empty disables the disk tier
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 3600))
+
+# Per prompt family TTLs, overridable with LLM_CACHE_TTL_<FAMILY>
+LLM_CACHE_TTLS = {
+    family: int(os.getenv(f"LLM_CACHE_TTL_{family.upper()}", ttl))
+    for family, ttl in {
+        "executive_summary": 6 * 3600,
+        "logistics_report": 3600,
+        "vendor_po": 6 * 3600,
+        "rfq": 24 * 3600,
+        "quote_analysis": 6 * 3600,
+        "approval_request": 6 * 3600,
+        "payment_request": 24 * 3600,
+        "logistics_handoff": 24 * 3600,
+    }.items()
+}
+
+# Decision audit log writer
+AUDIT_LOG_SYNC = os.getenv("AUDIT_LOG_SYNC", "false").lower() == "true"
+AUDIT_LOG_BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", 100))
+AUDIT_LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL_SECONDS", 2.0))
+AUDIT_LOG_MAX_PENDING = int(os.getenv("AUDIT_LOG_MAX_PENDING", 10000))
+
+# SMTP configuration
+SENDER_EMAIL = os.getenv("SENDER_EMAIL", "operations@company.com")
+SENDER_PASSWORD = os.getenv("SENDER_PASSWORD", "")
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"  # false for a local debugging server
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 4))
+SMTP_MAX_MESSAGES_PER_SESSION = int(os.getenv("SMTP_MAX_MESSAGES_PER_SESSION", 100))
+SMTP_SEND_RETRIES = int(os.getenv("SMTP_SEND_RETRIES", 2))
+
+# Outbound email queue
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 50))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 5))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", 30))
+OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", 3600))
+OUTBOX_CLAIM_LEASE_SECONDS = float(os.getenv("OUTBOX_CLAIM_LEASE_SECONDS", 600))
+OUTBOX_ERROR_BACKOFF_MAX_SECONDS = float(os.getenv("OUTBOX_ERROR_BACKOFF_MAX_SECONDS", 60))
+
+# Analyst agent
+ANALYST_AGGREGATE_MODE = os.getenv("ANALYST_AGGREGATE_MODE", "true").lower() == "true"
+ANALYST_WINDOW_DAYS = int(os.getenv("ANALYST_WINDOW_DAYS", 7))
+# Trailing days recomputed on each rollup refresh, to pick up late log rows
+ANALYST_ROLLUP_REFRESH_DAYS = int(os.getenv("ANALYST_ROLLUP_REFRESH_DAYS", 7))
+
+# Server-side cursor batch size for streaming scans
+DB_STREAM_ITERSIZE = int(os.getenv("DB_STREAM_ITERSIZE", 2000))
+
+# Logistics agent
+LOGISTICS_HORIZON_DAYS = int(os.getenv("LOGISTICS_HORIZON_DAYS", 0)) or None  # 0 = no horizon
+LOGISTICS_REPORT_TOP_N = int(os.getenv("LOGISTICS_REPORT_TOP_N", 10))
+# Re-run the open-shipments query under EXPLAIN ANALYZE each cycle to report rows scanned
+LOGISTICS_SCAN_STATS = os.getenv("LOGISTICS_SCAN_STATS", "false").lower() == "true"
+
+# Prompt token budgets (estimated tokens), overridable with PROMPT_TOKEN_BUDGET_<FAMILY>
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 1500))
+PROMPT_TOKEN_BUDGETS = {
+    family: int(os.getenv(f"PROMPT_TOKEN_BUDGET_{family.upper()}", budget))
+    for family, budget in {
+        "executive_summary": 1200,
+        "logistics_report": 2000,
+        "vendor_po": 1500,
+        "rfq": 1200,
+        "quote_analysis": 1500,
+        "approval_request": 1200,
+        "payment_request": 800,
+        "logistics_handoff": 800,
+    }.items()
+}
+
+# Document rendering: templates first, optional LLM polish in the outbox worker
+COMPANY_NAME = os.getenv("COMPANY_NAME", "Operations Team")
+LLM_POLISH_MODE = os.getenv("LLM_POLISH_MODE", "off")  # off | high_value | all
+LLM_POLISH_MIN_VALUE = float(os.getenv("LLM_POLISH_MIN_VALUE", 10000))
+
+# Tracing: spans are kept in memory and each top-level cycle is exported as OTLP JSON
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+TRACE_EXPORT_ENABLED = os.getenv("TRACE_EXPORT_ENABLED", "true").lower() == "true"
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", 20000))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "ai-operations-agent")
+
+# Metrics: Prometheus text endpoint (0 = off)
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+
+# Profiling (--profile): output directory and sampling interval
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_SECONDS", 0.005))
+PROFILE_LOOP_DETACH_TIMEOUT_SECONDS = float(os.getenv("PROFILE_LOOP_DETACH_TIMEOUT_SECONDS", 5))
@@ -1,15 +1,299 @@
+import threading
+import time
+import re
+import uuid
+from contextlib import contextmanager
+
 import psycopg2
-from dotenv import load_dotenv
-import os
+from psycopg2 import extensions, pool
+
+import config
+import metrics
+import tracing
+
+_pool = None
+_pool_lock = threading.Lock()
+_pool_slots = None
+
+_WITH_PREFIX = re.compile(r"^\s*WITH\b.*?\)\s*(?=SELECT|INSERT|UPDATE|DELETE)", re.IGNORECASE | re.DOTALL)
+_WRITE_TARGET = re.compile(r"^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(?:ONLY\s+)?([\w.]+)", re.IGNORECASE)
+_DECLARE_PREFIX = re.compile(r"^\s*DECLARE\s+\S+\s.*?\bFOR\s+", re.IGNORECASE | re.DOTALL)
+_SELECT_FROM = re.compile(r"^\s*SELECT\b.*?\bFROM\s+([\w.]+)", re.IGNORECASE | re.DOTALL)
+
+
+def _statement_text(query):
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    return " ".join(str(query).split())[:500]
+
+
+def query_name(statement):
+    """Short metric label for a statement, e.g. 'select inventory' or 'insert rfq_records'
+
+    Writes are named by their target table, SELECTs by their first FROM table.
+    """
+    declare = _DECLARE_PREFIX.match(statement)
+    if declare:
+        # Server-side cursor: name it after the query it streams
+        return "declare " + query_name(statement[declare.end():]).partition(" ")[2]
+
+    statement = _WITH_PREFIX.sub("", statement, count=1)
+
+    match = _WRITE_TARGET.match(statement)
+    if match:
+        return f"{match.group(1).split()[0].lower()} {match.group(2).lower()}"
+
+    match = _SELECT_FROM.match(statement)
+    if match:
+        return f"select {match.group(1).lower()}"
+
+    return statement.split(" ", 1)[0].lower() or "unknown"
+
+
+class TracingCursor(extensions.cursor):
+    """Cursor that records a span and a latency observation for every statement"""
+
+    def execute(self, query, vars=None):
+        statement = _statement_text(query)
+
+        with tracing.span("db.query", {"db.system": "postgresql", "db.statement": statement}) as span, \
+                metrics.timer("db_query_duration_seconds", query=query_name(statement)):
+            result = super().execute(query, vars)
+            span.set_attribute("db.rows", self.rowcount)
+            return result
+
+    def executemany(self, query, vars_list):
+        statement = _statement_text(query)
+
+        with tracing.span("db.query", {"db.system": "postgresql", "db.statement": statement}) as span, \
+                metrics.timer("db_query_duration_seconds", query=query_name(statement)):
+            result = super().executemany(query, vars_list)
+            span.set_attribute("db.rows", self.rowcount)
+            return result
+
+
+def _connect_kwargs():
+    return {
+        "host": config.DB_HOST,
+        "database": config.DB_NAME,
+        "user": config.DB_USER,
+        "password": config.DB_PASSWORD,
+        "port": config.DB_PORT,
+        "cursor_factory": TracingCursor,
+    }
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool, _pool_slots
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool_slots = threading.BoundedSemaphore(config.DB_POOL_MAX)
+                _pool = pool.ThreadedConnectionPool(
+                    config.DB_POOL_MIN,
+                    config.DB_POOL_MAX,
+                    **_connect_kwargs()
+                )
+    return _pool
+
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1;")
+        cur.close()
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+@contextmanager
+def db_connection():
+    """Check out a pooled connection and return it to the pool on exit"""
+    conn_pool = get_pool()
+
+    # Not made current: stream_query holds a checkout across yields, so its
+    # lifetime does not nest inside the caller's spans
+    span = tracing.start_span("db.connection")
+
+    # ThreadedConnectionPool raises instead of blocking when exhausted,
+    # so callers queue on the semaphore until a slot frees up
+    wait_start = time.perf_counter()
+    _pool_slots.acquire()
+    wait_seconds = time.perf_counter() - wait_start
+    metrics.observe("db_pool_wait_seconds", wait_seconds)
+    span.set_attribute("db.pool.wait_ms", round(wait_seconds * 1000, 3))
+
+    try:
+        conn = conn_pool.getconn()
+
+        if not _is_healthy(conn):
+            metrics.inc("db_pool_health_check_failures_total")
+            span.set_attribute("db.pool.replaced_unhealthy", True)
+            conn_pool.putconn(conn, close=True)
+            conn = conn_pool.getconn()
+    except Exception as e:
+        _pool_slots.release()
+        span.record_error(e)
+        span.end()
+        raise
+
+    checkout_start = time.perf_counter()
+    metrics.inc("db_pool_connections_in_use")
+
+    try:
+        yield conn
+    finally:
+        broken = bool(conn.closed)
+
+        if not broken:
+            try:
+                # Never hand back a connection with an open transaction
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+
+        conn_pool.putconn(conn, close=broken)
+        _pool_slots.release()
+        metrics.inc("db_pool_connections_in_use", -1)
+        metrics.observe("db_connection_checkout_seconds", time.perf_counter() - checkout_start)
+        span.end()
+
+
+def stream_query(sql, params=None, itersize=None, name=None):
+    """Yield rows from a server-side (named) cursor, itersize rows per round trip
+
+    Memory stays flat regardless of result size. The pooled connection is
+    held until the generator is exhausted or closed.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor(name=name or f"stream_{uuid.uuid4().hex}")
+        cur.itersize = itersize or config.DB_STREAM_ITERSIZE
+
+        try:
+            cur.execute(sql, params)
+
+            for row in cur:
+                yield row
+        finally:
+            cur.close()
+
+
+def explain_analyze(sql, params=None):
+    """Run sql under EXPLAIN (ANALYZE, BUFFERS) and return its JSON plan
+
+    The statement really executes, so only use it for reads.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+            return cur.fetchone()[0][0]
+        finally:
+            cur.close()
+
+
+def try_advisory_lock(key):
+    """Take a session-level advisory lock on a dedicated connection outside the pool
+
+    Returns the connection holding the lock, or None if another session
+    already holds it. Closing the connection releases the lock, so a
+    long-running holder never ties up a pooled connection.
+    """
+    conn = psycopg2.connect(**_connect_kwargs())
+
+    try:
+        # Autocommit: the lock outlives transactions, and the session
+        # must not sit idle in transaction while it is held
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute("SELECT pg_try_advisory_lock(hashtext(%s));", (key,))
+        acquired = cur.fetchone()[0]
+        cur.close()
+    except Exception:
+        conn.close()
+        raise
+
+    if not acquired:
+        conn.close()
+        return None
+
+    return conn
+
+
+def get_pool_stats():
+    """Snapshot of pool wait and checkout duration, read from the metrics registry"""
+    wait = metrics.get_histogram("db_pool_wait_seconds")
+    checkout = metrics.get_histogram("db_connection_checkout_seconds")
+
+    return {
+        "checkouts": checkout["count"],
+        "in_use": metrics.get_value("db_pool_connections_in_use"),
+        "wait_seconds_total": wait["sum"],
+        "wait_seconds_avg": wait["sum"] / wait["count"] if wait["count"] else 0.0,
+        "checkout_seconds_total": checkout["sum"],
+        "checkout_seconds_avg": checkout["sum"] / checkout["count"] if checkout["count"] else 0.0,
+        "health_check_failures": metrics.get_value("db_pool_health_check_failures_total"),
+    }
+
+
+def close_pool():
+    """Close every pooled connection"""
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+
+
+_ensured = set()
+_ensured_lock = threading.Lock()
+
+
+def ensure_schema(name, ddl):
+    """Run idempotent DDL (CREATE ... IF NOT EXISTS) once per process"""
+    if name in _ensured:
+        return
+
+    with _ensured_lock:
+        if name in _ensured:
+            return
+
+        with db_connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(ddl)
+                conn.commit()
+            finally:
+                cur.close()
+
+        _ensured.add(name)
+
+
+class _PooledConnection:
+    """Pooled connection whose close() returns it to the pool"""
+
+    def __init__(self):
+        self._checkout = db_connection()
+        self._conn = self._checkout.__enter__()
+
+    def close(self):
+        if self._checkout is not None:
+            checkout, self._checkout = self._checkout, None
+            checkout.__exit__(None, None, None)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
 
-load_dotenv()
 
 def get_connection():
-    conn = psycopg2.connect(
-        host="localhost",
-        database="operations-ai",
-        user=os.getenv("DB_USER"),
-        password=os.getenv("DB_PASSWORD"),
-        port="5432"
-    )
-    return conn
\ No newline at end of file
+    """Legacy checkout: the returned connection goes back to the pool on close()"""
+    return _PooledConnection()
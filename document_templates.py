@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from string import Template
+
+import config
+from prompt_builder import render_table, truncate_text
+
+TEMPLATES = {
+    "rfq": Template("""Dear $vendor_name team,
+
+$company_name requests a quotation for the items below.
+
+$items
+
+Please include in your quotation:
+- Unit price and total price per item
+- Quote validity period (30 days)
+- Delivery timeline from order confirmation
+
+Kindly send your quotation by $response_deadline (5 business days) to $contact_email.
+
+Best regards,
+$company_name
+$contact_email
+"""),
+
+    "approval_request": Template("""Hello,
+
+Purchase approval is requested for the following order.
+
+Item: $item_name
+Vendor: $vendor_name
+Quote Price: $$$quote_price
+Delivery Time: $delivery_days days
+
+Analysis:
+$analysis
+
+Please approve or reject by $decision_deadline (next business day).
+Once approved, the purchase order will be issued to the vendor and a
+payment request sent to finance.
+
+Best regards,
+$company_name
+"""),
+
+    "payment_request": Template("""Hello Finance team,
+
+Please authorize payment for the purchase order below.
+
+PO Number: $po_number
+Vendor: $vendor_name
+Amount: $$$total_amount
+Payment Terms: NET 30
+Payment Method: $payment_method
+
+Please process within 3 business days of invoice receipt and request
+the vendor's bank details if they are not on file. This PO was approved
+by the purchasing manager.
+
+For questions contact $contact_email.
+
+Best regards,
+$company_name
+"""),
+
+    "logistics_handoff": Template("""Hello Logistics team,
+
+The following purchase order has been issued and is ready for tracking.
+
+PO Number: $po_number
+Vendor: $vendor_name
+Item: $item_name
+Quantity: $quantity
+Total Amount: $$$amount
+Lead Time: $delivery_days days
+Expected Delivery: $expected_delivery
+
+Next steps:
+- Track the shipment and post status updates
+- Inspect quantity and quality on receipt against the PO
+- Escalate delays or discrepancies to $contact_email
+
+Best regards,
+$company_name
+"""),
+}
+
+
+def _business_days_from_now(days):
+    date = datetime.now()
+
+    while days > 0:
+        date += timedelta(days=1)
+        if date.weekday() < 5:
+            days -= 1
+
+    return date.strftime('%Y-%m-%d')
+
+
+def render_document(kind, **fields):
+    """Render a business document from its template; no LLM involved"""
+    defaults = {
+        "company_name": config.COMPANY_NAME,
+        "contact_email": config.SENDER_EMAIL,
+        "response_deadline": _business_days_from_now(5),
+        "decision_deadline": _business_days_from_now(1),
+    }
+
+    if isinstance(fields.get("items"), list):
+        fields["items"] = render_table(fields["items"])
+
+    if "analysis" in fields:
+        fields["analysis"] = truncate_text(fields["analysis"] or "No analysis available", 400)
+
+    return TEMPLATES[kind].substitute({**defaults, **fields})
+
+
+def should_polish(order_value=None):
+    """Whether a rendered document should get an LLM polish in the outbox worker"""
+    if config.LLM_POLISH_MODE == "all":
+        return True
+
+    if config.LLM_POLISH_MODE == "high_value":
+        return order_value is not None and float(order_value) >= config.LLM_POLISH_MIN_VALUE
+
+    return False
+
+
+def polish_family(kind, order_value=None):
+    """Prompt family to polish under, or None to send the template as rendered"""
+    return kind if should_polish(order_value) else None
@@ -0,0 +1,103 @@
+import threading
+
+
+def section_title(section):
+    """Display heading for a section name such as 'procurement/<vendor>'"""
+    if section == "analyst_summary":
+        return "EXECUTIVE SUMMARY"
+    if section == "logistics_report":
+        return "LOGISTICS REPORT"
+
+    kind, _, subject = section.partition("/")
+    if kind == "procurement":
+        return f"PURCHASE ORDER -> {subject}"
+    return f"{kind.replace('_', ' ').upper()} -> {subject}"
+
+
+class LiveOutput:
+    """Text chunks streamed by a running cycle, grouped into named sections
+
+    Agents write chunks as the LLM produces them; any number of readers
+    (the console printer, dashboard sessions) can follow a section from
+    its first chunk while it is still being written.
+    """
+
+    def __init__(self):
+        self._chunks = {}
+        self._closed = set()
+        self._finished = False
+        self._cond = threading.Condition()
+
+    def write(self, section, chunk):
+        with self._cond:
+            self._chunks.setdefault(section, []).append(chunk)
+            self._cond.notify_all()
+
+    def close(self, section):
+        with self._cond:
+            self._chunks.setdefault(section, [])
+            self._closed.add(section)
+            self._cond.notify_all()
+
+    def finish(self):
+        """Mark the run as over; readers stop waiting for further output"""
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def collect(self, section, chunks):
+        """Write every chunk of an iterator to section and return the joined text"""
+        parts = []
+
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                self.write(section, chunk)
+        finally:
+            self.close(section)
+
+        return "".join(parts)
+
+    def snapshot(self):
+        """[(section, text so far, closed)] in opening order, without waiting"""
+        with self._cond:
+            return [
+                (section, "".join(chunks), section in self._closed or self._finished)
+                for section, chunks in self._chunks.items()
+            ]
+
+    def sections(self):
+        """Yield section names in the order they were opened until the run finishes"""
+        seen = 0
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._chunks) > seen or self._finished)
+                names = list(self._chunks)[seen:]
+                finished = self._finished
+
+            yield from names
+            seen += len(names)
+
+            if finished and not names:
+                return
+
+    def follow(self, section):
+        """Yield a section's chunks from the start, waiting for new ones until it closes"""
+        seen = 0
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: len(self._chunks.get(section, ())) > seen
+                    or section in self._closed
+                    or self._finished
+                )
+                chunks = self._chunks.get(section, [])[seen:]
+                done = section in self._closed or self._finished
+
+            yield from chunks
+            seen += len(chunks)
+
+            if done and not chunks:
+                return
@@ -0,0 +1,139 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+import metrics
+
+_lock = threading.Lock()
+_memory = OrderedDict()
+_disk = None
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "stores": 0}
+
+
+def normalize_prompt(prompt):
+    """Collapse whitespace so indentation-only differences share a cache entry"""
+    lines = (" ".join(line.split()) for line in prompt.strip().splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def cache_key(model, prompt):
+    payload = f"{model}\0{normalize_prompt(prompt)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def ttl_for(family):
+    return config.LLM_CACHE_TTLS.get(family, config.LLM_CACHE_TTL_SECONDS)
+
+
+def _get_disk():
+    global _disk
+
+    if _disk is None and config.LLM_CACHE_PATH:
+        _disk = sqlite3.connect(config.LLM_CACHE_PATH, check_same_thread=False)
+        _disk.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                family TEXT,
+                response TEXT,
+                expires_at REAL
+            );
+        """)
+        _disk.commit()
+    return _disk
+
+
+def _remember(key, response, expires_at):
+    _memory[key] = (response, expires_at)
+    _memory.move_to_end(key)
+
+    while len(_memory) > config.LLM_CACHE_MAX_ENTRIES:
+        _memory.popitem(last=False)
+
+
+def get(key):
+    """Return the cached response for key, or None on a miss"""
+    now = time.time()
+    expired = False
+
+    with _lock:
+        entry = _memory.get(key)
+
+        if entry:
+            response, expires_at = entry
+            if expires_at > now:
+                _memory.move_to_end(key)
+                _stats["memory_hits"] += 1
+                return response
+
+            del _memory[key]
+            expired = True
+
+        disk = _get_disk()
+        if disk is not None:
+            row = disk.execute(
+                "SELECT response, expires_at FROM llm_cache WHERE cache_key = ?;", (key,)
+            ).fetchone()
+
+            if row and row[1] > now:
+                _remember(key, row[0], row[1])
+                _stats["disk_hits"] += 1
+                return row[0]
+
+            if row:
+                disk.execute("DELETE FROM llm_cache WHERE cache_key = ?;", (key,))
+                disk.commit()
+                expired = True
+
+        # One lookup counts once, however many tiers held the stale entry
+        if expired:
+            _stats["expired"] += 1
+        _stats["misses"] += 1
+        return None
+
+
+def put(key, response, family="default"):
+    """Store a response under key for the family's TTL"""
+    expires_at = time.time() + ttl_for(family)
+
+    with _lock:
+        _remember(key, response, expires_at)
+        _stats["stores"] += 1
+
+        disk = _get_disk()
+        if disk is not None:
+            disk.execute("""
+                INSERT OR REPLACE INTO llm_cache (cache_key, family, response, expires_at)
+                VALUES (?, ?, ?, ?);
+            """, (key, family, response, expires_at))
+            disk.commit()
+
+
+def clear():
+    """Drop every cached response from both tiers"""
+    with _lock:
+        _memory.clear()
+
+        disk = _get_disk()
+        if disk is not None:
+            disk.execute("DELETE FROM llm_cache;")
+            disk.commit()
+
+
+def get_cache_stats():
+    with _lock:
+        stats = dict(_stats)
+
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0.0
+    stats["memory_entries"] = len(_memory)
+    return stats
+
+
+@metrics.register_collector
+def _collect_gauges():
+    stats = get_cache_stats()
+    metrics.set_value("llm_cache_memory_entries", stats["memory_entries"])
+    metrics.set_value("llm_cache_hit_ratio", stats["hit_rate"])
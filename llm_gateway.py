@@ -0,0 +1,278 @@
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import time
+
+from langchain_ollama import OllamaLLM
+
+import config
+import llm_cache
+import metrics
+import profiling
+import prompt_builder
+import tracing
+
+_llm = None
+_llm_lock = threading.Lock()
+
+# Every request runs on one gateway event loop, which owns the global
+# concurrency limit and the table of in-flight prompts
+_loop = None
+_loop_lock = threading.Lock()
+_semaphore = None
+_inflight = {}
+
+_STREAM_END = object()
+
+
+def _record_metrics(family, seconds, response=None, outcome="ok"):
+    metrics.inc("llm_requests_total", family=family, outcome=outcome)
+
+    # Cache hits and failures would skew model latency and throughput
+    if response is None or outcome != "ok":
+        return
+
+    tokens = prompt_builder.estimate_tokens(response)
+    metrics.observe("llm_request_duration_seconds", seconds, family=family)
+    metrics.inc("llm_completion_tokens_total", tokens, family=family)
+
+    if seconds > 0:
+        metrics.observe("llm_tokens_per_second", tokens / seconds, family=family)
+
+
+def _span_attributes(prompt, family):
+    return {
+        "llm.model": config.LLM_MODEL,
+        "llm.family": family,
+        "llm.prompt_chars": len(prompt),
+        "llm.prompt_tokens_estimate": prompt_builder.estimate_tokens(prompt),
+    }
+
+
+def get_llm():
+    """Return the process-wide LLM client, creating it on first use"""
+    global _llm
+
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                # One client means one underlying HTTP connection pool, so
+                # every agent and thread reuses keep-alive connections
+                _llm = OllamaLLM(
+                    model=config.LLM_MODEL,
+                    base_url=config.OLLAMA_BASE_URL,
+                    keep_alive=config.OLLAMA_KEEP_ALIVE,
+                    client_kwargs={"timeout": config.LLM_TIMEOUT_SECONDS}
+                )
+    return _llm
+
+
+@metrics.register_collector
+def _collect_gauges():
+    metrics.set_value("llm_requests_in_flight", len(_inflight))
+
+
+def _get_loop():
+    global _loop, _semaphore
+
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True).start()
+
+                _semaphore = asyncio.Semaphore(config.OLLAMA_NUM_PARALLEL)
+                profiling.register_loop("llm_gateway", loop)
+                _loop = loop
+    return _loop
+
+
+def _cached(key):
+    return llm_cache.get(key) if config.LLM_CACHE_ENABLED else None
+
+
+async def _store(key, response, family):
+    # The SQLite tier reads and commits on disk, so it never runs on the
+    # gateway loop, where it would stall every other request
+    if config.LLM_CACHE_ENABLED:
+        await asyncio.get_running_loop().run_in_executor(None, llm_cache.put, key, response, family)
+
+
+async def _generate(prompt, key, family):
+    async with _semaphore:
+        response = await get_llm().ainvoke(prompt)
+
+    await _store(key, response, family)
+    return response
+
+
+async def _submit(prompt, key, family):
+    """On the gateway loop: join an identical in-flight request, or start one
+
+    Callers check llm_cache themselves first, off the gateway loop.
+    """
+    entry = _inflight.get(key)
+
+    if entry is None:
+        task = asyncio.ensure_future(_generate(prompt, key, family))
+        entry = _inflight[key] = {"task": task, "waiters": 0}
+        task.add_done_callback(lambda _, entry=entry: _inflight.get(key) is entry and _inflight.pop(key))
+
+    entry["waiters"] += 1
+
+    try:
+        # shield: one caller timing out must not cancel the others' request
+        return await asyncio.shield(entry["task"])
+    finally:
+        entry["waiters"] -= 1
+
+        if entry["waiters"] == 0 and not entry["task"].done():
+            entry["task"].cancel()
+
+
+async def _stream_into(prompt, key, family, chunks):
+    """On the gateway loop: relay completion chunks into a thread-safe queue"""
+    try:
+        parts = []
+
+        async with _semaphore:
+            async for chunk in get_llm().astream(prompt):
+                if chunk:
+                    parts.append(chunk)
+                    chunks.put(chunk)
+
+        await _store(key, "".join(parts), family)
+    except Exception as e:
+        chunks.put(e)
+    finally:
+        chunks.put(_STREAM_END)
+
+
+async def ainvoke(prompt, family="default", timeout=None):
+    """Submit a prompt to the gateway from any event loop and await the completion
+
+    Identical prompts already in flight share one request, at most
+    OLLAMA_NUM_PARALLEL requests run at once, and completions are cached
+    in llm_cache for the family's TTL. Cancelling the caller or hitting the
+    timeout abandons the request once no other caller is waiting on it.
+    """
+    prompt_builder.record_prompt(family, prompt)
+    key = llm_cache.cache_key(config.LLM_MODEL, prompt)
+
+    with tracing.span("llm.invoke", _span_attributes(prompt, family)) as span:
+        start = time.perf_counter()
+        cached = await asyncio.get_running_loop().run_in_executor(None, _cached, key)
+
+        if cached is not None:
+            _record_metrics(family, time.perf_counter() - start, cached, "cache_hit")
+            span.set_attributes({"llm.cache_hit": True, "llm.response_chars": len(cached)})
+            return cached
+
+        future = asyncio.run_coroutine_threadsafe(_submit(prompt, key, family), _get_loop())
+
+        try:
+            response = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout or config.LLM_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            future.cancel()
+            _record_metrics(family, time.perf_counter() - start, outcome="timeout")
+            raise
+        except asyncio.CancelledError:
+            future.cancel()
+            _record_metrics(family, time.perf_counter() - start, outcome="cancelled")
+            raise
+        except Exception:
+            _record_metrics(family, time.perf_counter() - start, outcome="error")
+            raise
+
+        _record_metrics(family, time.perf_counter() - start, response)
+        span.set_attributes({"llm.cache_hit": False, "llm.response_chars": len(response)})
+        return response
+
+
+def invoke(prompt, family="default", timeout=None):
+    """Blocking form of ainvoke for agents running on ordinary threads"""
+    prompt_builder.record_prompt(family, prompt)
+    key = llm_cache.cache_key(config.LLM_MODEL, prompt)
+
+    with tracing.span("llm.invoke", _span_attributes(prompt, family)) as span:
+        start = time.perf_counter()
+        cached = _cached(key)
+
+        if cached is not None:
+            _record_metrics(family, time.perf_counter() - start, cached, "cache_hit")
+            span.set_attributes({"llm.cache_hit": True, "llm.response_chars": len(cached)})
+            return cached
+
+        future = asyncio.run_coroutine_threadsafe(_submit(prompt, key, family), _get_loop())
+
+        try:
+            response = future.result(timeout or config.LLM_TIMEOUT_SECONDS)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            _record_metrics(family, time.perf_counter() - start, outcome="timeout")
+            raise TimeoutError(f"LLM request for '{family}' timed out")
+        except Exception:
+            _record_metrics(family, time.perf_counter() - start, outcome="error")
+            raise
+
+        _record_metrics(family, time.perf_counter() - start, response)
+        span.set_attributes({"llm.cache_hit": False, "llm.response_chars": len(response)})
+        return response
+
+
+def stream(prompt, family="default", timeout=None):
+    """Yield the completion for prompt in chunks as the model produces them
+
+    A cached completion is yielded whole. Otherwise the request counts
+    against OLLAMA_NUM_PARALLEL like any other and its full text is cached
+    once the stream ends. timeout bounds the wait for each chunk, and
+    closing the iterator early cancels the upstream request.
+    """
+    prompt_builder.record_prompt(family, prompt)
+    key = llm_cache.cache_key(config.LLM_MODEL, prompt)
+
+    # A generator's lifetime does not nest in the caller's spans
+    span = tracing.start_span("llm.stream", _span_attributes(prompt, family))
+    start = time.perf_counter()
+    parts = []
+
+    cached = _cached(key)
+
+    if cached is not None:
+        span.set_attributes({"llm.cache_hit": True, "llm.response_chars": len(cached)})
+        span.end()
+        _record_metrics(family, time.perf_counter() - start, cached, "cache_hit")
+        yield cached
+        return
+
+    chunks = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(_stream_into(prompt, key, family, chunks), _get_loop())
+
+    try:
+        while True:
+            try:
+                chunk = chunks.get(timeout=timeout or config.LLM_TIMEOUT_SECONDS)
+            except queue.Empty:
+                raise TimeoutError(f"LLM stream for '{family}' timed out")
+
+            if chunk is _STREAM_END:
+                _record_metrics(family, time.perf_counter() - start, "".join(parts))
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+
+            if not parts:
+                span.set_attribute("llm.time_to_first_chunk_ms", round((time.perf_counter() - start) * 1000, 3))
+            parts.append(chunk)
+            yield chunk
+    except Exception as e:
+        span.record_error(e)
+        _record_metrics(family, time.perf_counter() - start, outcome="timeout" if isinstance(e, TimeoutError) else "error")
+        raise
+    finally:
+        future.cancel()
+        span.set_attribute("llm.response_chars", sum(len(part) for part in parts))
+        span.end()
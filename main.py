@@ -1,4 +1,26 @@
+import argparse
+
+import metrics
+import profiling
 from workflows.morning_cycle import run_morning_cycle
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the AI operations morning cycle")
+    parser.add_argument("--metrics-file", help="write Prometheus-format metrics to this file when the run ends")
+    parser.add_argument("--metrics-port", type=int, help="serve /metrics on this port while the cycle runs")
+    parser.add_argument("--profile", nargs="?", const="both", choices=profiling.MODES,
+                        help="profile the cycle and write per-agent pstats/collapsed stacks")
+    parser.add_argument("--profile-dir", help="profile output directory (default: PROFILE_DIR)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    run_morning_cycle()
\ No newline at end of file
+    args = parse_args()
+    metrics.start_http_server(args.metrics_port)
+
+    try:
+        run_morning_cycle(profile=args.profile, profile_dir=args.profile_dir)
+    finally:
+        if args.metrics_file:
+            metrics.write_metrics_file(args.metrics_file)
@@ -0,0 +1,241 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+THROUGHPUT_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "agent_cycle_duration_seconds": ("histogram", "Wall-clock duration of an agent or workflow cycle", LATENCY_BUCKETS),
+    "agent_cycles_total": ("counter", "Agent or workflow cycles run, by outcome", None),
+    "llm_request_duration_seconds": ("histogram", "LLM request latency per prompt family", LATENCY_BUCKETS),
+    "llm_tokens_per_second": ("histogram", "Estimated completion tokens per second per prompt family", THROUGHPUT_BUCKETS),
+    "llm_requests_total": ("counter", "LLM requests per prompt family, by outcome", None),
+    "llm_completion_tokens_total": ("counter", "Estimated completion tokens per prompt family", None),
+    "db_query_duration_seconds": ("histogram", "SQL statement latency per named query", LATENCY_BUCKETS),
+    "db_pool_wait_seconds": ("histogram", "Time spent waiting for a pooled connection", LATENCY_BUCKETS),
+    "db_connection_checkout_seconds": ("histogram", "Time a pooled connection is held", LATENCY_BUCKETS),
+    "db_pool_connections_in_use": ("gauge", "Pooled connections currently checked out", None),
+    "db_pool_health_check_failures_total": ("counter", "Pooled connections replaced after a failed health check", None),
+    "llm_requests_in_flight": ("gauge", "Distinct prompts awaiting a completion on the LLM gateway", None),
+    "llm_cache_memory_entries": ("gauge", "Responses held in the in-memory LLM cache tier", None),
+    "llm_cache_hit_ratio": ("gauge", "Share of LLM cache lookups served from either tier", None),
+    "prompt_tokens_avg": ("gauge", "Average estimated prompt tokens per prompt family", None),
+    "prompt_tokens_max": ("gauge", "Largest estimated prompt per prompt family", None),
+    "prompts_over_budget_total": ("counter", "Prompts built over their family's token budget", None),
+    "emails_total": ("counter", "Emails handed to SMTP, by outcome", None),
+    "procurement_documents_total": ("counter", "RFQs, quotes and purchase orders processed", None),
+}
+
+_lock = threading.Lock()
+_values = {}
+_histograms = {}
+_collectors = []
+
+
+def _key(name, labels):
+    if name not in METRICS:
+        raise KeyError(f"Unknown metric '{name}'")
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    """Add to a counter or gauge"""
+    key = _key(name, labels)
+
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+
+
+def set_value(name, value, **labels):
+    """Set a gauge"""
+    key = _key(name, labels)
+
+    with _lock:
+        _values[key] = value
+
+
+def register_collector(func):
+    """Call func before each render, to refresh gauges read from module state with set_value"""
+    with _lock:
+        _collectors.append(func)
+    return func
+
+
+def _run_collectors():
+    with _lock:
+        collectors = list(_collectors)
+
+    for collect in collectors:
+        try:
+            collect()
+        except Exception as e:
+            # One broken collector must not fail the whole scrape
+            print(f"Error collecting metrics in {collect.__name__}: {e}")
+
+
+def observe(name, value, **labels):
+    """Record one histogram observation"""
+    key = _key(name, labels)
+    buckets = METRICS[name][2]
+
+    with _lock:
+        histogram = _histograms.get(key)
+
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0}
+
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                histogram["buckets"][index] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    """Observe the duration of the enclosed block in seconds"""
+    start = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def timed_cycle(agent):
+    """Decorator recording agent_cycle_duration_seconds and agent_cycles_total for agent"""
+    def decorate(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            outcome = "error"
+
+            try:
+                with timer("agent_cycle_duration_seconds", agent=agent):
+                    result = func(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                inc("agent_cycles_total", agent=agent, outcome=outcome)
+
+        return run
+
+    return decorate
+
+
+def get_value(name, **labels):
+    with _lock:
+        return _values.get(_key(name, labels), 0)
+
+
+def get_histogram(name, **labels):
+    """{"sum", "count"} for one labelled histogram"""
+    with _lock:
+        histogram = _histograms.get(_key(name, labels))
+        return {"sum": histogram["sum"], "count": histogram["count"]} if histogram else {"sum": 0.0, "count": 0}
+
+
+def reset():
+    with _lock:
+        _values.clear()
+        _histograms.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def render_prometheus():
+    """All metrics in the Prometheus text exposition format"""
+    _run_collectors()
+
+    with _lock:
+        values = dict(_values)
+        histograms = {key: {**h, "buckets": list(h["buckets"])} for key, h in _histograms.items()}
+
+    lines = []
+
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+        if kind == "histogram":
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+
+                for bound, count in zip(buckets, histogram["buckets"]):
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        else:
+            for (metric, labels), value in sorted(values.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path):
+    """Dump the current metrics to path in Prometheus text format"""
+    try:
+        with open(path, "w") as f:
+            f.write(render_prometheus())
+    except OSError as e:
+        print(f"Error writing metrics file {path}: {e}")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_http_server(port=None, host=None):
+    """Serve /metrics on a daemon thread; safe to call more than once per process"""
+    global _server
+
+    port = port or config.METRICS_PORT
+
+    if not port:
+        return None
+
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host or config.METRICS_HOST, port), _MetricsHandler)
+            except OSError as e:
+                print(f"Error starting metrics endpoint on port {port}: {e}")
+                return None
+
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    return _server
@@ -0,0 +1,76 @@
+from database import db_connection
+
+# Schema the agents read but do not create at runtime. Run once per
+# database, and again after upgrades, as a role allowed to run DDL:
+#
+#     python migrations.py
+
+TABLES = {
+    "production_daily_rollup": """
+        CREATE TABLE IF NOT EXISTS production_daily_rollup (
+            production_date DATE NOT NULL,
+            item_name TEXT NOT NULL,
+            units_produced BIGINT NOT NULL DEFAULT 0,
+            units_scrapped BIGINT NOT NULL DEFAULT 0,
+            machine_hours NUMERIC NOT NULL DEFAULT 0,
+            downtime_minutes BIGINT NOT NULL DEFAULT 0,
+            refreshed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (production_date, item_name)
+        );
+    """,
+}
+
+# Built with CREATE INDEX CONCURRENTLY, so writers to the table are not
+# blocked while a large index builds
+INDEXES = {
+    "idx_production_log_date": "ON production_log (production_date)",
+    "idx_shipment_schedule_open": """
+        ON shipment_schedule (expected_arrival, item_name)
+        WHERE status <> 'Delivered'
+    """,
+}
+
+
+def _drop_invalid_index(cur, name):
+    # An interrupted CONCURRENTLY build leaves an INVALID index behind,
+    # which IF NOT EXISTS would then keep forever
+    cur.execute("""
+        SELECT NOT indisvalid
+        FROM pg_index
+        WHERE indexrelid = to_regclass(%s);
+    """, (name,))
+    invalid = cur.fetchone()
+
+    if invalid and invalid[0]:
+        print(f"Dropping invalid index {name}")
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name};")
+
+
+def run_migrations():
+    """Create the tables, then build the indexes without locking out writes"""
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            for name, ddl in TABLES.items():
+                print(f"Ensuring table {name}")
+                cur.execute(ddl)
+
+            conn.commit()
+
+            # CONCURRENTLY cannot run inside a transaction block
+            conn.autocommit = True
+
+            for name, definition in INDEXES.items():
+                _drop_invalid_index(cur, name)
+                print(f"Ensuring index {name}")
+                cur.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition};")
+        finally:
+            if conn.autocommit:
+                conn.autocommit = False
+            cur.close()
+
+
+if __name__ == "__main__":
+    run_migrations()
+    print("Migrations complete.")
@@ -0,0 +1,291 @@
+import cProfile
+import collections
+import contextvars
+import functools
+import os
+import pstats
+import sys
+import threading
+from contextlib import contextmanager
+
+import config
+
+MODES = ("both", "cprofile", "sampling")
+
+# One session at a time: cProfile output (.pstats) and sampled stacks per
+# agent in the collapsed format flamegraph.pl and speedscope read
+_session = None
+_session_lock = threading.Lock()
+
+_current_agent = contextvars.ContextVar("profiled_agent", default=None)
+
+# From 3.12 cProfile sits on sys.monitoring, which is process wide: one
+# Profile sees every thread and a second enable() raises ValueError. There
+# a session runs a single profiler written to process.pstats, and the
+# per-agent breakdown comes from the sampled stacks
+_PROCESS_WIDE_CPROFILE = sys.version_info >= (3, 12)
+
+# Event loops that do work for every agent (the LLM gateway) are profiled
+# on their own thread as a bucket of their own, e.g. llm_gateway.pstats
+_loops = {}
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _sample(session):
+    interval = config.PROFILE_SAMPLE_INTERVAL_SECONDS
+
+    while not session["stop"].wait(interval):
+        with session["lock"]:
+            threads = dict(session["threads"])
+
+        frames = sys._current_frames()
+
+        for ident, agent in threads.items():
+            frame = frames.get(ident)
+            stack = []
+
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+
+            if stack:
+                with session["lock"]:
+                    session["samples"][agent][";".join(reversed(stack))] += 1
+
+
+def _enable_profile(session):
+    # A running per-thread cProfile, or None when this session has none
+    if session["mode"] not in ("both", "cprofile") or _PROCESS_WIDE_CPROFILE:
+        return None
+
+    profile = cProfile.Profile()
+
+    try:
+        profile.enable()
+    except ValueError as e:
+        # Some other tool (a debugger, coverage) holds the profiling hook
+        print(f"cProfile unavailable, sampling only: {e}")
+        return None
+
+    return profile
+
+
+def start(mode="both", output_dir=None):
+    """Begin a profiling session; returns False if one is already running"""
+    global _session
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown profile mode '{mode}', expected one of {MODES}")
+
+    with _session_lock:
+        if _session is not None:
+            return False
+
+        session = {
+            "mode": mode,
+            "dir": output_dir or config.PROFILE_DIR,
+            "lock": threading.Lock(),
+            "threads": {},
+            "profiles": collections.defaultdict(list),
+            "samples": collections.defaultdict(collections.Counter),
+            "stop": threading.Event(),
+            "sampler": None,
+            "loop_profiles": {},
+            "process_profile": None,
+        }
+
+        if mode in ("both", "cprofile") and _PROCESS_WIDE_CPROFILE:
+            profile = cProfile.Profile()
+
+            try:
+                profile.enable()
+                session["process_profile"] = profile
+            except ValueError as e:
+                print(f"cProfile unavailable, sampling only: {e}")
+
+        if mode in ("both", "sampling"):
+            session["sampler"] = threading.Thread(target=_sample, args=(session,), name="profile-sampler", daemon=True)
+            session["sampler"].start()
+
+        _session = session
+        loops = dict(_loops)
+
+    for name, loop in loops.items():
+        _call_on_loop(loop, _attach_loop, session, name)
+    return True
+
+
+def stop():
+    """End the session and write per-agent files; returns the paths written"""
+    global _session
+
+    with _session_lock:
+        session, _session = _session, None
+
+    if session is None:
+        return []
+
+    session["stop"].set()
+    if session["sampler"] is not None:
+        session["sampler"].join()
+
+    if session["process_profile"] is not None:
+        session["process_profile"].disable()
+
+    with _session_lock:
+        loops = dict(_loops)
+
+    for name, loop in loops.items():
+        detached = threading.Event()
+
+        if _call_on_loop(loop, _detach_loop, session, name, detached):
+            # A loop blocked for longer than this loses its profile, not the run
+            detached.wait(config.PROFILE_LOOP_DETACH_TIMEOUT_SECONDS)
+
+    with session["lock"]:
+        profiles_by_agent = {agent: list(profiles) for agent, profiles in session["profiles"].items()}
+        samples_by_agent = dict(session["samples"])
+
+    if session["process_profile"] is not None:
+        profiles_by_agent["process"] = [session["process_profile"]]
+
+    os.makedirs(session["dir"], exist_ok=True)
+    paths = []
+
+    try:
+        for agent, profiles in profiles_by_agent.items():
+            path = os.path.join(session["dir"], f"{agent}.pstats")
+            pstats.Stats(*profiles).dump_stats(path)
+            paths.append(path)
+
+        for agent, stacks in samples_by_agent.items():
+            path = os.path.join(session["dir"], f"{agent}.collapsed")
+
+            with open(path, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths.append(path)
+    except OSError as e:
+        print(f"Error writing profile output: {e}")
+
+    return paths
+
+
+def register_loop(name, loop):
+    """Profile the thread running loop as its own bucket, now and in later sessions"""
+    with _session_lock:
+        _loops[name] = loop
+        session = _session
+
+    if session is not None:
+        _call_on_loop(loop, _attach_loop, session, name)
+
+
+def _call_on_loop(loop, func, *args):
+    try:
+        loop.call_soon_threadsafe(func, *args)
+        return True
+    except RuntimeError:
+        # Loop already closed
+        return False
+
+
+def _attach_loop(session, name):
+    # Runs on the loop thread; a session that stopped before this callback
+    # ran has already been written out
+    if session["stop"].is_set():
+        return
+
+    with session["lock"]:
+        session["threads"][threading.get_ident()] = name
+
+    profile = _enable_profile(session)
+
+    with session["lock"]:
+        session["loop_profiles"][name] = profile
+
+
+def _detach_loop(session, name, detached):
+    with session["lock"]:
+        session["threads"].pop(threading.get_ident(), None)
+        profile = session["loop_profiles"].pop(name, None)
+
+    if profile is not None:
+        profile.disable()
+
+        with session["lock"]:
+            session["profiles"][name].append(profile)
+
+    detached.set()
+
+
+@contextmanager
+def session(mode="both", output_dir=None):
+    """Profile the enclosed block, printing where the per-agent files went"""
+    started = start(mode, output_dir)
+
+    try:
+        yield
+    finally:
+        if started:
+            for path in stop():
+                print(f"Profile written to {path}")
+
+
+@contextmanager
+def profiled(agent):
+    """Attribute work on this thread to agent while a session is running"""
+    session = _session
+    ident = threading.get_ident()
+
+    if session is None:
+        yield
+        return
+
+    with session["lock"]:
+        # Nested agents on one thread stay with the outer one
+        nested = ident in session["threads"]
+
+    if nested:
+        yield
+        return
+
+    token = _current_agent.set(agent)
+    profile = None
+
+    with session["lock"]:
+        session["threads"][ident] = agent
+
+    try:
+        profile = _enable_profile(session)
+        yield
+    finally:
+        if profile is not None:
+            profile.disable()
+
+        with session["lock"]:
+            session["threads"].pop(ident, None)
+
+            if profile is not None:
+                session["profiles"][agent].append(profile)
+
+        _current_agent.reset(token)
+
+
+def inherit(func):
+    """Run func, on whatever thread, as part of the agent profiled at wrap time"""
+    agent = _current_agent.get()
+
+    if agent is None:
+        return func
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        with profiled(agent):
+            return func(*args, **kwargs)
+
+    return run
@@ -0,0 +1,116 @@
+import threading
+
+import config
+import metrics
+
+# Rough English average for llama-family tokenizers
+CHARS_PER_TOKEN = 4
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def budget_for(family):
+    return config.PROMPT_TOKEN_BUDGETS.get(family, config.PROMPT_TOKEN_BUDGET)
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def render_mapping(mapping):
+    """key: value lines instead of a Python dict repr"""
+    return "\n".join(f"- {key}: {_format_value(value)}" for key, value in mapping.items())
+
+
+def render_table(rows, columns=None, omitted=0):
+    """Pipe-separated table of dict rows, one header line and one line per row"""
+    rows = list(rows)
+
+    if not rows:
+        return "(none)" if not omitted else f"({omitted} rows omitted)"
+
+    columns = columns or list(rows[0].keys())
+    lines = [" | ".join(columns)]
+    lines.extend(" | ".join(_format_value(row.get(col, "")) for col in columns) for row in rows)
+
+    if omitted:
+        lines.append(f"... {omitted} more rows omitted")
+
+    return "\n".join(lines)
+
+
+def truncate_text(text, max_tokens):
+    """Cut free text to roughly max_tokens, marking the cut"""
+    text = str(text)
+    max_chars = max_tokens * CHARS_PER_TOKEN
+
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + " [truncated]"
+
+
+def build_prompt(family, template, tables=None, columns=None, **fields):
+    """Render template with compact tables, trimming table rows to the family's token budget
+
+    tables maps placeholder names to lists of dict rows; columns optionally
+    maps the same names to the columns to show. Remaining keyword
+    arguments are substituted as-is.
+    """
+    budget = budget_for(family)
+    tables = {name: list(rows) for name, rows in (tables or {}).items()}
+    columns = columns or {}
+    kept = {name: len(rows) for name, rows in tables.items()}
+
+    while True:
+        rendered = {
+            name: render_table(rows[:kept[name]], columns.get(name), omitted=len(rows) - kept[name])
+            for name, rows in tables.items()
+        }
+        prompt = template.format(**fields, **rendered)
+        tokens = estimate_tokens(prompt)
+
+        if tokens <= budget or not any(kept.values()):
+            return prompt
+
+        # Shrink the largest table in proportion to the overshoot
+        name = max(kept, key=kept.get)
+        kept[name] = min(kept[name] - 1, kept[name] * budget // tokens)
+
+
+def record_prompt(family, prompt):
+    """Track prompt sizes per family to see which prompts dominate LLM time"""
+    tokens = estimate_tokens(prompt)
+
+    with _stats_lock:
+        stats = _stats.setdefault(family, {"calls": 0, "tokens_total": 0, "tokens_max": 0, "over_budget": 0})
+        stats["calls"] += 1
+        stats["tokens_total"] += tokens
+        stats["tokens_max"] = max(stats["tokens_max"], tokens)
+
+        if tokens > budget_for(family):
+            stats["over_budget"] += 1
+
+    return tokens
+
+
+def get_prompt_stats():
+    with _stats_lock:
+        return {
+            family: {**stats, "tokens_avg": round(stats["tokens_total"] / stats["calls"], 1)}
+            for family, stats in _stats.items()
+        }
+
+
+@metrics.register_collector
+def _collect_gauges():
+    for family, stats in get_prompt_stats().items():
+        metrics.set_value("prompt_tokens_avg", stats["tokens_avg"], family=family)
+        metrics.set_value("prompt_tokens_max", stats["tokens_max"], family=family)
+        metrics.set_value("prompts_over_budget_total", stats["over_budget"], family=family)
@@ -1,6 +1,4 @@
-from langchain_ollama import OllamaLLM
+from llm_gateway import invoke
 
-llm = OllamaLLM(model="llama3")
-
-response = llm.invoke("Say hello like a factory operations manager.")
-print(response)
\ No newline at end of file
+response = invoke("Say hello like a factory operations manager.")
+print(response)
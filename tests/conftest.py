@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+# Modules live at the repository root; the smoke scripts there (test_*.py)
+# need a live database and Ollama, so only this directory is collected
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Point the pool at TEST_DB_NAME with the base tables recreated empty
+
+    Skipped unless TEST_DB_NAME is set: every table the agents use is
+    dropped in that database, so never point it at real data.
+    """
+    import psycopg2
+
+    import audit_log
+    import database
+    import migrations
+
+    name = os.getenv("TEST_DB_NAME")
+
+    if not name:
+        pytest.skip("set TEST_DB_NAME to a scratch database to run database tests")
+
+    database.close_pool()
+    monkeypatch.setattr(config, "DB_NAME", name)
+    monkeypatch.setattr(database, "_ensured", set())
+    # Decisions are written before the test ends, not by a writer thread
+    # that outlives the config change
+    monkeypatch.setattr(audit_log, "_sync", True)
+
+    with open(SCHEMA_PATH) as f:
+        schema = f.read()
+
+    try:
+        with database.db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(schema)
+            conn.commit()
+            cur.close()
+    except psycopg2.OperationalError as e:
+        database.close_pool()
+        pytest.skip(f"test database unavailable: {e}")
+
+    migrations.run_migrations()
+
+    yield database
+
+    database.close_pool()
@@ -0,0 +1,105 @@
+-- Base tables as the agents use them, recreated empty for each database test
+DROP TABLE IF EXISTS
+    inventory, vendors, inventory_vendors, rfqs, vendor_quotes, purchase_approvals,
+    purchase_orders, shipment_schedule, production_log, production_daily_rollup,
+    ai_decision_log, analyst_reports, email_outbox, cycle_results
+CASCADE;
+
+CREATE TABLE inventory (
+    item_id SERIAL PRIMARY KEY,
+    item_name TEXT NOT NULL,
+    current_stock INTEGER NOT NULL,
+    reorder_level INTEGER NOT NULL,
+    unit_price NUMERIC(10, 2) NOT NULL
+);
+
+CREATE TABLE vendors (
+    vendor_id SERIAL PRIMARY KEY,
+    vendor_name TEXT NOT NULL,
+    vendor_email TEXT NOT NULL,
+    lead_time_days INTEGER NOT NULL DEFAULT 7,
+    payment_terms TEXT NOT NULL DEFAULT 'Net 30',
+    is_approved BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE inventory_vendors (
+    item_id INTEGER NOT NULL REFERENCES inventory,
+    vendor_id INTEGER NOT NULL REFERENCES vendors,
+    unit_price NUMERIC(10, 2) NOT NULL,
+    rating NUMERIC(2, 1) NOT NULL
+);
+
+CREATE TABLE rfqs (
+    rfq_id SERIAL PRIMARY KEY,
+    item_id INTEGER NOT NULL REFERENCES inventory,
+    vendor_id INTEGER NOT NULL REFERENCES vendors,
+    rfq_number TEXT NOT NULL,
+    required_qty INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    created_date TIMESTAMP NOT NULL
+);
+
+CREATE TABLE vendor_quotes (
+    quote_id SERIAL PRIMARY KEY,
+    rfq_id INTEGER NOT NULL REFERENCES rfqs,
+    vendor_id INTEGER NOT NULL REFERENCES vendors,
+    quote_price NUMERIC(10, 2) NOT NULL,
+    delivery_days INTEGER NOT NULL,
+    validity_days INTEGER NOT NULL DEFAULT 30,
+    status TEXT NOT NULL DEFAULT 'RECEIVED'
+);
+
+CREATE TABLE purchase_approvals (
+    approval_id SERIAL PRIMARY KEY,
+    quote_id INTEGER NOT NULL REFERENCES vendor_quotes,
+    requested_date TIMESTAMP NOT NULL,
+    approved_date TIMESTAMP,
+    status TEXT NOT NULL,
+    manager_email TEXT NOT NULL
+);
+
+CREATE TABLE purchase_orders (
+    po_id SERIAL PRIMARY KEY,
+    quote_id INTEGER NOT NULL REFERENCES vendor_quotes,
+    po_number TEXT NOT NULL,
+    po_date TIMESTAMP NOT NULL,
+    amount NUMERIC(12, 2) NOT NULL,
+    status TEXT NOT NULL
+);
+
+CREATE TABLE shipment_schedule (
+    shipment_id SERIAL PRIMARY KEY,
+    po_number TEXT,
+    item_name TEXT,
+    expected_arrival DATE NOT NULL,
+    quantity INTEGER NOT NULL,
+    carrier TEXT,
+    status TEXT NOT NULL
+);
+
+CREATE TABLE production_log (
+    log_id SERIAL PRIMARY KEY,
+    production_date DATE NOT NULL,
+    item_name TEXT NOT NULL,
+    units_produced INTEGER NOT NULL,
+    units_scrapped INTEGER NOT NULL,
+    machine_hours NUMERIC NOT NULL,
+    downtime_minutes INTEGER NOT NULL
+);
+
+CREATE TABLE ai_decision_log (
+    log_id SERIAL PRIMARY KEY,
+    agent_name TEXT NOT NULL,
+    decision_summary TEXT NOT NULL,
+    confidence_score NUMERIC NOT NULL,
+    human_approved BOOLEAN NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE analyst_reports (
+    report_id SERIAL PRIMARY KEY,
+    trend_percent NUMERIC,
+    scrap_rate NUMERIC,
+    summary TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,74 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOllama:
+    """Local HTTP server answering /api/generate like Ollama, for gateway tests
+
+    Records every prompt it receives and the peak number of requests it
+    served at once. Each completion is streamed as NDJSON after `delay`
+    seconds.
+    """
+
+    def __init__(self, delay=0.2, response="stub completion"):
+        self.delay = delay
+        self.response = response
+        self.prompts = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub._enter(body.get("prompt"))
+
+                try:
+                    time.sleep(stub.delay)
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.end_headers()
+
+                    for word in stub.response.split(" "):
+                        self._write_line(body["model"], word + " ", False)
+                    self._write_line(body["model"], "", True)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up on the request
+                    pass
+                finally:
+                    stub._exit()
+
+            def _write_line(self, model, text, done):
+                line = {"model": model, "created_at": "2024-01-01T00:00:00Z", "response": text, "done": done}
+                if done:
+                    line.update({"done_reason": "stop", "eval_count": 1, "eval_duration": 1})
+                self.wfile.write((json.dumps(line) + "\n").encode())
+                self.wfile.flush()
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _enter(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _exit(self):
+        with self._lock:
+            self.active -= 1
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
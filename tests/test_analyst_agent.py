@@ -0,0 +1,53 @@
+import datetime
+
+import pytest
+
+import config
+from agents import analyst_agent
+
+TODAY = datetime.date.today()
+
+
+@pytest.fixture
+def production(db):
+    rows = [
+        (TODAY - datetime.timedelta(days=day), item, 100 + 10 * day + shift, 2 + shift, 8, 15)
+        for day in range(10)
+        for item in ("gears", "bolts")
+        for shift in range(2)
+    ]
+
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.executemany("""
+            INSERT INTO production_log
+                (production_date, item_name, units_produced, units_scrapped, machine_hours, downtime_minutes)
+            VALUES (%s, %s, %s, %s, %s, %s);
+        """, rows)
+        conn.commit()
+        cur.close()
+
+    return rows
+
+
+def _run_cycle(monkeypatch, aggregate):
+    monkeypatch.setattr(config, "ANALYST_AGGREGATE_MODE", aggregate)
+    monkeypatch.setattr(analyst_agent, "generate_executive_summary", lambda kpis, trend, out_of_control: "summary")
+    return analyst_agent.run_analysis_cycle()
+
+
+def test_server_side_aggregation_matches_the_row_level_path(production, monkeypatch):
+    aggregated = _run_cycle(monkeypatch, True)
+    row_level = _run_cycle(monkeypatch, False)
+
+    assert aggregated == row_level
+    assert aggregated["item_analysis"]["days"] == config.ANALYST_WINDOW_DAYS
+
+
+def test_window_rows_are_one_per_day_and_item(production):
+    rows = analyst_agent.fetch_production_window(3)
+
+    assert [(row[0], row[1]) for row in rows] == [
+        (TODAY - datetime.timedelta(days=day), item) for day in (2, 1, 0) for item in ("bolts", "gears")
+    ]
+    assert rows[-1][2:4] == (201, 5)
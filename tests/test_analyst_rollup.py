@@ -0,0 +1,53 @@
+import datetime
+
+from agents import analyst_agent
+
+TODAY = datetime.date.today()
+
+
+def _log(db, *rows):
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.executemany("""
+            INSERT INTO production_log
+                (production_date, item_name, units_produced, units_scrapped, machine_hours, downtime_minutes)
+            VALUES (%s, %s, %s, %s, 8, 0);
+        """, rows)
+        conn.commit()
+        cur.close()
+
+
+def _days_ago(days):
+    return TODAY - datetime.timedelta(days=days)
+
+
+def _window(days=7):
+    return {(row[0], row[1]): (row[2], row[3]) for row in analyst_agent.fetch_production_window(days)}
+
+
+def test_empty_rollup_is_backfilled_in_full(db):
+    _log(db, (_days_ago(60), "gears", 100, 2), (TODAY, "gears", 50, 1), (TODAY, "gears", 25, 0))
+
+    assert _window(90) == {(_days_ago(60), "gears"): (100, 2), (TODAY, "gears"): (75, 1)}
+
+
+def test_late_rows_for_recent_days_are_folded_in(db):
+    _log(db, (_days_ago(3), "bolts", 100, 5), (TODAY, "bolts", 10, 0))
+    assert _window()[(_days_ago(3), "bolts")] == (100, 5)
+
+    # Logged after the rollup already covered that day
+    _log(db, (_days_ago(3), "bolts", 40, 1))
+
+    assert _window()[(_days_ago(3), "bolts")] == (140, 6)
+
+
+def test_days_outside_the_refresh_window_need_since(db, monkeypatch):
+    monkeypatch.setattr(analyst_agent.config, "ANALYST_ROLLUP_REFRESH_DAYS", 2)
+    _log(db, (_days_ago(5), "bolts", 100, 5), (TODAY, "bolts", 10, 0))
+    analyst_agent.refresh_production_rollup()
+
+    _log(db, (_days_ago(5), "bolts", 40, 1))
+    assert _window()[(_days_ago(5), "bolts")] == (100, 5)
+
+    analyst_agent.refresh_production_rollup(since=_days_ago(5))
+    assert _window()[(_days_ago(5), "bolts")] == (140, 6)
@@ -0,0 +1,50 @@
+import config
+import pp
+from tools import outbox
+
+
+def _quote(db, required_qty, quote_price):
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            WITH item AS (
+                INSERT INTO inventory (item_name, current_stock, reorder_level, unit_price)
+                VALUES ('gears', 5, 50, 20) RETURNING item_id
+            ), vendor AS (
+                INSERT INTO vendors (vendor_name, vendor_email)
+                VALUES ('Acme', 'sales@acme.example') RETURNING vendor_id
+            ), rfq AS (
+                INSERT INTO rfqs (item_id, vendor_id, rfq_number, required_qty, status, created_date)
+                SELECT item_id, vendor_id, 'RFQ-1', %s, 'SENT', NOW() FROM item, vendor
+                RETURNING rfq_id, vendor_id
+            )
+            INSERT INTO vendor_quotes (rfq_id, vendor_id, quote_price, delivery_days)
+            SELECT rfq_id, vendor_id, %s, 5 FROM rfq
+            RETURNING quote_id;
+        """, (required_qty, quote_price))
+        quote_id = cur.fetchone()[0]
+        conn.commit()
+        cur.close()
+
+    return {"quote_id": quote_id, "vendor_name": "Acme", "price": quote_price, "delivery_days": 5}
+
+
+def _queued_polish_family(db):
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT polish_family FROM email_outbox;")
+        rows = cur.fetchall()
+        cur.close()
+    return rows
+
+
+def test_approval_polish_threshold_uses_the_order_total(db, monkeypatch):
+    monkeypatch.setattr(config, "LLM_POLISH_MODE", "high_value")
+    monkeypatch.setattr(config, "LLM_POLISH_MIN_VALUE", 1000)
+    outbox.ensure_outbox_table()
+
+    # 20 per unit is under the threshold, 100 units of it is not
+    result = pp.request_purchase_approval(_quote(db, 100, 20))
+
+    assert result["status"] == "approval_requested"
+    assert _queued_polish_family(db) == [("approval_request",)]
@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+import audit_log
+import config
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Queue decisions for the background writer, capturing its batches"""
+    written = []
+    done = threading.Event()
+
+    def write_decisions(decisions):
+        written.append(list(decisions))
+        done.set()
+        return True
+
+    monkeypatch.setattr(audit_log, "_sync", False)
+    monkeypatch.setattr(audit_log, "_pending", [])
+    monkeypatch.setattr(audit_log, "write_decisions", write_decisions)
+    monkeypatch.setattr(config, "AUDIT_LOG_BATCH_SIZE", 3)
+    monkeypatch.setattr(config, "AUDIT_LOG_FLUSH_INTERVAL_SECONDS", 60)
+
+    return written, done
+
+
+def _row(i):
+    return (f"Agent {i}", f"decision {i}", 0.9, False)
+
+
+def test_a_full_batch_wakes_the_writer(batches):
+    written, done = batches
+
+    for i in range(2):
+        audit_log.log_decision(*_row(i))
+
+    assert not done.wait(0.2)
+
+    audit_log.log_decision(*_row(2))
+
+    assert done.wait(5)
+    assert written == [[_row(0), _row(1), _row(2)]]
+
+
+def test_failed_batches_are_requeued_in_order(monkeypatch):
+    results = [False, True]
+    written = []
+
+    def write_decisions(decisions):
+        written.append(list(decisions))
+        return results.pop(0)
+
+    monkeypatch.setattr(audit_log, "_pending", [_row(0), _row(1)])
+    monkeypatch.setattr(audit_log, "write_decisions", write_decisions)
+
+    audit_log.flush()
+    assert audit_log._pending == [_row(0), _row(1)]
+
+    audit_log._pending.append(_row(2))
+    audit_log.flush()
+
+    assert written[-1] == [_row(0), _row(1), _row(2)]
+    assert audit_log._pending == []
+
+
+def test_backlog_drops_the_oldest_rows_when_full(monkeypatch):
+    monkeypatch.setattr(config, "AUDIT_LOG_MAX_PENDING", 2)
+    monkeypatch.setattr(audit_log, "_pending", [_row(0), _row(1)])
+    monkeypatch.setattr(audit_log, "write_decisions", lambda decisions: False)
+
+    audit_log._pending.append(_row(2))
+    audit_log.flush()
+
+    assert audit_log._pending == [_row(1), _row(2)]
+
+
+def test_flush_writes_one_statement_per_batch(db, monkeypatch):
+    monkeypatch.setattr(audit_log, "_pending", [_row(i) for i in range(5)])
+
+    audit_log.flush()
+
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT agent_name FROM ai_decision_log ORDER BY log_id;")
+        assert [row[0] for row in cur.fetchall()] == [f"Agent {i}" for i in range(5)]
+        cur.close()
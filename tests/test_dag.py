@@ -0,0 +1,38 @@
+import threading
+
+import pytest
+
+from workflows.dag import run_dag
+
+
+def test_nodes_receive_their_dependencies_results():
+    nodes = {
+        "a": (lambda results: 1, []),
+        "b": (lambda results: results["a"] + 1, ["a"]),
+        "c": (lambda results: results["a"] + results["b"], ["a", "b"]),
+    }
+
+    results, timings = run_dag(nodes)
+
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert timings["c"]["start_seconds"] >= timings["b"]["end_seconds"]
+
+
+def test_independent_nodes_run_concurrently():
+    barrier = threading.Barrier(2, timeout=2)
+    nodes = {
+        "left": (lambda results: barrier.wait() is not None, []),
+        "right": (lambda results: barrier.wait() is not None, []),
+    }
+
+    results, _ = run_dag(nodes)
+
+    assert results == {"left": True, "right": True}
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError):
+        run_dag({"a": (lambda results: 1, ["missing"])})
+
+    with pytest.raises(ValueError):
+        run_dag({"a": (lambda results: 1, ["b"]), "b": (lambda results: 2, ["a"])})
@@ -0,0 +1,92 @@
+import threading
+
+import config
+import metrics
+
+
+def test_connections_are_reused_from_the_pool(db):
+    with db.db_connection() as conn:
+        first = conn.get_backend_pid()
+
+    with db.db_connection() as conn:
+        assert conn.get_backend_pid() == first
+
+
+def test_legacy_get_connection_returns_to_the_pool_on_close(db):
+    in_use = metrics.get_value("db_pool_connections_in_use")
+    conn = db.get_connection()
+
+    assert metrics.get_value("db_pool_connections_in_use") == in_use + 1
+
+    conn.close()
+    conn.close()
+
+    assert metrics.get_value("db_pool_connections_in_use") == in_use
+
+
+def test_checkouts_beyond_the_pool_size_wait_for_a_slot(db, monkeypatch):
+    db.close_pool()
+    monkeypatch.setattr(config, "DB_POOL_MAX", 2)
+    errors = []
+
+    def checkout():
+        try:
+            for _ in range(5):
+                with db.db_connection() as conn:
+                    cur = conn.cursor()
+                    cur.execute("SELECT pg_sleep(0.01);")
+                    cur.close()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=checkout) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert db.get_pool_stats()["checkouts"] >= 30
+
+
+def test_broken_connections_are_replaced(db):
+    with db.db_connection() as conn:
+        conn.close()
+
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT 1;")
+        assert cur.fetchone() == (1,)
+        cur.close()
+
+
+def test_stream_query_fetches_in_batches_and_releases_its_connection(db):
+    in_use = metrics.get_value("db_pool_connections_in_use")
+    rows = db.stream_query("SELECT n FROM generate_series(1, 10) AS n ORDER BY n;", itersize=3)
+
+    assert next(rows) == (1,)
+    assert metrics.get_value("db_pool_connections_in_use") == in_use + 1
+    assert [row[0] for row in rows] == list(range(2, 11))
+    assert metrics.get_value("db_pool_connections_in_use") == in_use
+
+    # Closing a half-read stream returns the connection too
+    rows = db.stream_query("SELECT n FROM generate_series(1, 10) AS n;", itersize=3)
+    next(rows)
+    rows.close()
+
+    assert metrics.get_value("db_pool_connections_in_use") == in_use
+
+
+def test_stream_query_uses_a_server_side_cursor(db):
+    rows = db.stream_query("SELECT n FROM generate_series(1, 5) AS n;", itersize=2, name="test_stream")
+    next(rows)
+
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT query FROM pg_stat_activity WHERE query LIKE 'FETCH%%test_stream%%';")
+        fetches = [row[0] for row in cur.fetchall()]
+        cur.close()
+
+    rows.close()
+
+    assert fetches == ['FETCH FORWARD 2 FROM "test_stream"']
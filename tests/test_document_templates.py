@@ -0,0 +1,39 @@
+import pytest
+
+import config
+import document_templates
+
+
+def test_documents_render_without_an_llm():
+    body = document_templates.render_document(
+        "approval_request",
+        item_name="gears",
+        vendor_name="Acme",
+        quote_price="2.10",
+        delivery_days=5,
+        analysis=None
+    )
+
+    assert "Quote Price: $2.10" in body
+    assert "No analysis available" in body
+    assert config.COMPANY_NAME in body
+
+
+def test_rfq_item_lists_render_as_tables():
+    body = document_templates.render_document("rfq", vendor_name="Acme", items=[{"item": "gears", "qty": 40}])
+
+    assert "item | qty\ngears | 40" in body
+
+
+@pytest.mark.parametrize("mode, order_value, family", [
+    ("off", 50000, None),
+    ("all", None, "rfq"),
+    ("high_value", 9999, None),
+    ("high_value", 10000, "rfq"),
+    ("high_value", None, None),
+])
+def test_polish_is_chosen_by_mode_and_order_value(monkeypatch, mode, order_value, family):
+    monkeypatch.setattr(config, "LLM_POLISH_MODE", mode)
+    monkeypatch.setattr(config, "LLM_POLISH_MIN_VALUE", 10000)
+
+    assert document_templates.polish_family("rfq", order_value) == family
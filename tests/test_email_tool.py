@@ -0,0 +1,98 @@
+import queue
+import socket
+import threading
+
+import pytest
+
+import config
+from tools import email_tool
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class RecordingHandler:
+    """Accepts every message except to rejected@example.com, noting the session it arrived on"""
+
+    def __init__(self):
+        self.received = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == "rejected@example.com":
+            return "550 mailbox unavailable"
+
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append((session.peer, envelope.rcpt_tos[0]))
+        return "250 Message accepted for delivery"
+
+    @property
+    def sessions(self):
+        return len({session for session, _ in self.received})
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+
+    monkeypatch.setattr(config, "SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setattr(config, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(config, "SMTP_USE_TLS", False)
+    monkeypatch.setattr(config, "SENDER_PASSWORD", "")
+    monkeypatch.setattr(email_tool, "_idle", queue.LifoQueue())
+    monkeypatch.setattr(email_tool, "_slots", threading.BoundedSemaphore(2))
+
+    yield handler
+
+    email_tool.close_all()
+    controller.stop()
+
+
+def _messages(*recipients):
+    return [email_tool.build_message(recipient, "Subject", "Body") for recipient in recipients]
+
+
+def test_bulk_sends_reuse_one_pooled_session(smtp_server):
+    assert email_tool.send_bulk(_messages("a@example.com", "b@example.com")) == [True, True]
+    assert email_tool.send_email("c@example.com", "Subject", "Body")
+
+    assert [recipient for _, recipient in smtp_server.received] == ["a@example.com", "b@example.com", "c@example.com"]
+    assert smtp_server.sessions == 1
+
+
+def test_sessions_are_recycled_after_the_message_limit(smtp_server, monkeypatch):
+    monkeypatch.setattr(config, "SMTP_MAX_MESSAGES_PER_SESSION", 2)
+
+    results = email_tool.send_bulk(_messages(*(f"{i}@example.com" for i in range(5))))
+
+    assert results == [True] * 5
+    assert smtp_server.sessions == 3
+
+
+def test_dropped_sessions_are_reopened_and_the_rest_delivered(smtp_server):
+    email_tool.send_email("a@example.com", "Subject", "Body")
+
+    # The pooled session's connection dies while idle
+    stale = email_tool._idle.get_nowait()
+    stale.sock.shutdown(socket.SHUT_RDWR)
+    email_tool._idle.put(stale)
+
+    assert email_tool.send_bulk(_messages("b@example.com", "c@example.com")) == [True, True]
+    assert smtp_server.sessions == 2
+
+
+def test_rejected_recipients_fail_without_a_retry(smtp_server):
+    results = email_tool.send_bulk(_messages("a@example.com", "rejected@example.com", "b@example.com"))
+
+    assert results == [True, False, True]
+    assert [recipient for _, recipient in smtp_server.received] == ["a@example.com", "b@example.com"]
+    assert smtp_server.sessions == 1
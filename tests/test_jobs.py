@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from workflows import jobs
+from workflows.results_store import load_latest_failure, load_latest_result
+
+
+def _wait_for(job_name):
+    deadline = time.time() + 5
+    while job_name in jobs.running_jobs() and time.time() < deadline:
+        time.sleep(0.02)
+    assert job_name not in jobs.running_jobs()
+
+
+@pytest.fixture
+def fake_jobs(monkeypatch):
+    registry = {}
+    monkeypatch.setattr(jobs, "JOBS", registry)
+    return registry
+
+
+def test_job_result_is_stored(db, fake_jobs):
+    fake_jobs["echo"] = lambda live: {"answer": 42}
+
+    assert jobs.start_job("echo") == "started"
+    _wait_for("echo")
+
+    result, finished_at, trace = load_latest_result("echo")
+    assert result == {"answer": 42}
+    assert trace[0]["name"] == "job.echo"
+
+
+def test_errors_outside_the_job_are_recorded_as_failures(db, fake_jobs, monkeypatch):
+    fake_jobs["echo"] = lambda live: "done"
+
+    def broken_trace(name):
+        raise RuntimeError("tracer unavailable")
+
+    monkeypatch.setattr(jobs.tracing, "trace", broken_trace)
+
+    assert jobs.start_job("echo") == "started"
+    _wait_for("echo")
+
+    error, failed_at = load_latest_failure("echo")
+    assert error == "tracer unavailable"
+
+
+def test_lock_held_by_another_process_is_reported(db, fake_jobs):
+    fake_jobs["echo"] = lambda live: "done"
+    other = db.try_advisory_lock("cycle_job:echo")
+
+    try:
+        assert jobs.start_job("echo") == "running_elsewhere"
+        assert jobs.running_jobs() == {}
+    finally:
+        other.close()
+
+    assert jobs.start_job("echo") == "started"
+    _wait_for("echo")
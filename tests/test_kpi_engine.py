@@ -0,0 +1,48 @@
+import datetime
+
+import numpy as np
+
+from agents import kpi_engine
+
+DAY = datetime.date(2026, 1, 1)
+
+
+def _rows(item, produced_by_day, scrapped=0):
+    return [
+        (DAY + datetime.timedelta(days=i), item, produced, scrapped, 8, 0)
+        for i, produced in enumerate(produced_by_day)
+    ]
+
+
+def test_least_squares_slopes_recovers_linear_growth():
+    matrix = np.array([[10, 20, 30, 40], [5, 5, 5, 5]], dtype=float)
+
+    assert np.allclose(kpi_engine.least_squares_slopes(matrix), [10, 0])
+
+
+def test_overall_trend_is_positive_for_growing_production():
+    assert kpi_engine.overall_trend_percent(_rows("A", [100, 110, 120, 130])) > 0
+    assert kpi_engine.overall_trend_percent([]) == 0.0
+
+
+def test_analyze_items_flags_scrap_outliers_and_reports_null_limits():
+    rows = _rows("steady", [1000] * 5, scrapped=10) + _rows("bad", [100] * 5, scrapped=30)
+    rows.append((DAY, "idle", 0, 0, 0, 0))
+
+    analysis = kpi_engine.analyze_items(rows)
+    items = {item["item_name"]: item for item in analysis["items"]}
+
+    assert analysis["items_out_of_control"] == ["bad"]
+    assert items["idle"]["scrap_upper_limit_percent"] is None
+    assert items["steady"]["total_produced"] == 5000
+
+
+def test_trend_is_fitted_against_real_day_offsets():
+    # Days 0, 1 and 9: the last reading is eight days after the second
+    rows = [(DAY + datetime.timedelta(days=d), "A", units, 0, 8, 0) for d, units in [(0, 100), (1, 110), (9, 190)]]
+
+    analysis = kpi_engine.analyze_items(rows)
+
+    assert analysis["items"][0]["trend_slope_units_per_day"] == 10.0
+    assert analysis["items"][0]["trend_percent"] == 90.0
+    assert kpi_engine.overall_trend_percent(rows) == 90.0
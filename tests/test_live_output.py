@@ -0,0 +1,38 @@
+import threading
+
+import live_output
+from live_output import LiveOutput
+
+
+def test_followers_see_chunks_from_the_start_while_they_are_written():
+    live = LiveOutput()
+    written = threading.Event()
+    followed = []
+
+    live.write("analyst_summary", "Output ")
+
+    def follow():
+        for chunk in live.follow("analyst_summary"):
+            followed.append(chunk)
+            written.set()
+
+    reader = threading.Thread(target=follow)
+    reader.start()
+
+    assert written.wait(2)
+    live.collect("analyst_summary", iter(["is ", "up"]))
+    reader.join(2)
+
+    assert followed == ["Output ", "is ", "up"]
+    assert live.snapshot() == [("analyst_summary", "Output is up", True)]
+
+
+def test_sections_are_yielded_in_opening_order_until_finished():
+    live = LiveOutput()
+    live.collect("procurement/a@example.com", iter(["PO"]))
+    live.write("logistics_report", "partial")
+    live.finish()
+
+    assert list(live.sections()) == ["procurement/a@example.com", "logistics_report"]
+    assert live.snapshot()[-1] == ("logistics_report", "partial", True)
+    assert live_output.section_title("procurement/a@example.com") == "PURCHASE ORDER -> a@example.com"
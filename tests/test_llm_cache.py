@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+
+import pytest
+
+import config
+import llm_cache
+import metrics
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    """Empty cache with its disk tier in tmp_path"""
+    monkeypatch.setattr(config, "LLM_CACHE_PATH", str(tmp_path / "llm_cache.sqlite3"))
+    monkeypatch.setattr(config, "LLM_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(config, "LLM_CACHE_TTLS", {"short": 1})
+    monkeypatch.setattr(llm_cache, "_memory", OrderedDict())
+    monkeypatch.setattr(llm_cache, "_disk", None)
+    monkeypatch.setattr(llm_cache, "_stats", dict.fromkeys(llm_cache._stats, 0))
+
+    yield llm_cache
+
+    if llm_cache._disk is not None:
+        llm_cache._disk.close()
+
+
+def test_keys_ignore_indentation_but_not_model():
+    assert llm_cache.cache_key("m", "  a\n\n    b  ") == llm_cache.cache_key("m", "a\nb")
+    assert llm_cache.cache_key("m", "a") != llm_cache.cache_key("other", "a")
+
+
+def test_memory_tier_evicts_least_recently_used(cache):
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+
+    assert list(cache._memory) == ["a", "c"]
+
+
+def test_evicted_entries_are_served_from_disk(cache):
+    for key in "abc":
+        cache.put(key, key.upper())
+
+    assert "a" not in cache._memory
+    assert cache.get("a") == "A"
+    assert cache.get_cache_stats()["disk_hits"] == 1
+
+    # A fresh process reads the same file
+    cache._memory.clear()
+    cache._disk.close()
+    cache._disk = None
+
+    assert cache.get("c") == "C"
+
+
+def test_entries_expire_after_their_family_ttl(cache, monkeypatch):
+    cache.put("a", "A", family="short")
+    cache.put("b", "B")
+
+    later = time.time() + 2
+    monkeypatch.setattr(llm_cache.time, "time", lambda: later)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == "B"
+    assert cache.get_cache_stats()["expired"] == 1
+
+
+def test_stats_are_exported_as_gauges(cache):
+    cache.put("a", "A")
+    cache.get("a")
+    cache.get("missing")
+
+    text = metrics.render_prometheus()
+
+    assert "llm_cache_memory_entries 1" in text
+    assert "llm_cache_hit_ratio 0.5" in text
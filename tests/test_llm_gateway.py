@@ -0,0 +1,133 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pytest
+
+import config
+import llm_cache
+import llm_gateway
+import profiling
+from tests.stub_ollama import StubOllama
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    """Point a fresh gateway (client, loop, semaphore) at a stub Ollama server"""
+    stub = StubOllama().start()
+
+    monkeypatch.setattr(config, "OLLAMA_BASE_URL", stub.url)
+    monkeypatch.setattr(config, "LLM_CACHE_ENABLED", False)
+    monkeypatch.setattr(config, "OLLAMA_NUM_PARALLEL", 2)
+    monkeypatch.setattr(config, "TRACING_ENABLED", False)
+    monkeypatch.setattr(llm_gateway, "_llm", None)
+    monkeypatch.setattr(llm_gateway, "_loop", None)
+    monkeypatch.setattr(llm_gateway, "_semaphore", None)
+    monkeypatch.setattr(llm_gateway, "_inflight", {})
+    monkeypatch.setattr(profiling, "_loops", {})
+
+    yield stub
+
+    if llm_gateway._loop is not None:
+        llm_gateway._loop.call_soon_threadsafe(llm_gateway._loop.stop)
+    stub.stop()
+
+
+def _invoke_all(prompts, timeout=None):
+    results = [None] * len(prompts)
+
+    def run(index, prompt):
+        results[index] = llm_gateway.invoke(prompt, family="test", timeout=timeout)
+
+    threads = [threading.Thread(target=run, args=(i, p)) for i, p in enumerate(prompts)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_identical_in_flight_prompts_share_one_request(gateway):
+    results = _invoke_all(["a", "b", "a", "b", "a", "b"])
+
+    assert sorted(gateway.prompts) == ["a", "b"]
+    assert all(result.strip() == "stub completion" for result in results)
+
+
+def test_concurrency_is_capped_at_ollama_num_parallel(gateway):
+    _invoke_all([f"prompt {i}" for i in range(6)])
+
+    assert len(gateway.prompts) == 6
+    assert gateway.max_active == 2
+
+
+def test_timeout_cancels_the_upstream_request(gateway):
+    gateway.delay = 2
+
+    started = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        llm_gateway.invoke("slow", family="test", timeout=0.3)
+
+    assert time.perf_counter() - started < 1.5
+
+    # The abandoned request is dropped from the in-flight table
+    deadline = time.time() + 2
+    while llm_gateway._inflight and time.time() < deadline:
+        time.sleep(0.05)
+    assert llm_gateway._inflight == {}
+
+
+def test_stream_yields_chunks_in_order(gateway):
+    chunks = list(llm_gateway.stream("streamed", family="test"))
+
+    assert len(chunks) > 1
+    assert "".join(chunks).strip() == "stub completion"
+
+
+def test_cache_tiers_never_run_on_the_gateway_loop(gateway, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "LLM_CACHE_PATH", str(tmp_path / "llm_cache.db"))
+    monkeypatch.setattr(llm_cache, "_memory", OrderedDict())
+    monkeypatch.setattr(llm_cache, "_disk", None)
+    threads = []
+
+    def on_thread(fn):
+        def wrapper(*args):
+            threads.append(threading.current_thread().name)
+            return fn(*args)
+        return wrapper
+
+    monkeypatch.setattr(llm_cache, "get", on_thread(llm_cache.get))
+    monkeypatch.setattr(llm_cache, "put", on_thread(llm_cache.put))
+
+    first = llm_gateway.invoke("cached prompt", family="test")
+    second = llm_gateway.invoke("cached prompt", family="test")
+
+    assert first == second
+    assert gateway.prompts == ["cached prompt"]
+    assert len(threads) == 3
+    assert "llm-gateway" not in threads
+
+
+def test_profile_session_covers_gateway_thread(gateway, tmp_path):
+    llm_gateway.invoke("warm up", family="test")
+
+    with profiling.session(output_dir=str(tmp_path)):
+        llm_gateway.invoke("profiled prompt", family="test")
+
+    if sys.version_info < (3, 12):
+        assert (tmp_path / "llm_gateway.pstats").exists()
+    assert "run_forever" in (tmp_path / "llm_gateway.collapsed").read_text()
+
+
+def test_every_thread_shares_one_llm_client(gateway):
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(llm_gateway.get_llm())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(client) for client in clients}) == 1
+    assert clients[0].base_url == config.OLLAMA_BASE_URL
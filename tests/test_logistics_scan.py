@@ -0,0 +1,71 @@
+import datetime
+
+from agents import logistics_agent
+
+TODAY = datetime.date.today()
+
+
+def _ship(db, *rows):
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.executemany("""
+            INSERT INTO shipment_schedule (item_name, expected_arrival, quantity, carrier, status)
+            VALUES (%s, %s, 10, 'DHL', %s);
+        """, rows)
+        conn.commit()
+        cur.close()
+
+
+def test_open_shipment_index_is_built_by_migrations(db):
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass('idx_shipment_schedule_open');")
+        assert cur.fetchone() == (True,)
+        cur.close()
+
+
+def test_scan_stats_report_rows_actually_scanned(db):
+    _ship(db, ("gears", TODAY, "In Transit"), ("bolts", TODAY, "Delayed"), ("nuts", TODAY, "Delivered"))
+    scan_stats = {}
+
+    rows = list(logistics_agent.iter_open_shipments(scan_stats=scan_stats))
+
+    assert sorted(row[0] for row in rows) == ["bolts", "gears"]
+    assert scan_stats["rows_returned"] == 2
+    # The delivered row is never read once the partial index serves the query
+    assert 2 <= scan_stats["rows_scanned"] <= 3
+    assert scan_stats["shared_buffers"] >= 1
+
+
+def test_rows_scanned_counts_filtered_rows_and_loops():
+    plan = {"Plan": {
+        "Node Type": "Nested Loop", "Actual Rows": 4, "Actual Loops": 1,
+        "Plans": [
+            {"Node Type": "Seq Scan", "Relation Name": "a", "Actual Rows": 2,
+             "Actual Loops": 1, "Rows Removed by Filter": 8},
+            {"Node Type": "Index Scan", "Relation Name": "b", "Actual Rows": 2, "Actual Loops": 2},
+        ],
+    }}
+
+    assert logistics_agent._rows_scanned(plan) == 14
+
+
+def test_prioritize_risks_scores_a_stream_against_stock_in_transit(db):
+    _ship(db, ("gears", TODAY - datetime.timedelta(days=7), "Delayed"), ("bolts", TODAY, "In Transit"))
+
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO inventory (item_name, current_stock, reorder_level, unit_price)
+            VALUES ('gears', 5, 50, 1), ('bolts', 1000, 50, 1), ('nuts', 0, 50, 1);
+        """)
+        conn.commit()
+        cur.close()
+
+    flags = logistics_agent.assess_logistics_risk(logistics_agent.iter_open_shipments())
+    top, summary = logistics_agent.prioritize_risks(flags, top_n=1)
+
+    assert [s["item_name"] for s in top] == ["gears"]
+    assert top[0]["stock_exposure"] == 1.0
+    assert summary["open_shipments"] == 2
+    assert summary["late_shipments"] == 1
@@ -0,0 +1,61 @@
+import pytest
+
+import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_counters_render_with_labels():
+    metrics.inc("emails_total", 3, outcome="sent")
+    metrics.inc("emails_total", outcome="failed")
+
+    text = metrics.render_prometheus()
+
+    assert "# TYPE emails_total counter" in text
+    assert 'emails_total{outcome="sent"} 3' in text
+    assert 'emails_total{outcome="failed"} 1' in text
+
+
+def test_histograms_render_cumulative_buckets():
+    metrics.observe("llm_request_duration_seconds", 0.3, family="rfq")
+    metrics.observe("llm_request_duration_seconds", 3, family="rfq")
+
+    lines = metrics.render_prometheus().splitlines()
+
+    assert 'llm_request_duration_seconds_bucket{family="rfq",le="0.5"} 1' in lines
+    assert 'llm_request_duration_seconds_bucket{family="rfq",le="5"} 2' in lines
+    assert 'llm_request_duration_seconds_bucket{family="rfq",le="+Inf"} 2' in lines
+    assert 'llm_request_duration_seconds_count{family="rfq"} 2' in lines
+
+
+def test_label_values_are_escaped_and_unknown_metrics_rejected():
+    metrics.inc("procurement_documents_total", kind='say "hi"\n')
+
+    assert 'procurement_documents_total{kind="say \\"hi\\"\\n"} 1' in metrics.render_prometheus()
+
+    with pytest.raises(KeyError):
+        metrics.inc("not_a_metric")
+
+
+def test_collectors_refresh_gauges_on_render(monkeypatch):
+    monkeypatch.setattr(metrics, "_collectors", [])
+    in_use = []
+
+    @metrics.register_collector
+    def collect():
+        metrics.set_value("db_pool_connections_in_use", len(in_use))
+
+    @metrics.register_collector
+    def broken():
+        raise RuntimeError("collector failed")
+
+    in_use.append("conn")
+    assert "db_pool_connections_in_use 1" in metrics.render_prometheus()
+
+    in_use.clear()
+    assert "db_pool_connections_in_use 0" in metrics.render_prometheus()
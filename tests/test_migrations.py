@@ -0,0 +1,28 @@
+import migrations
+
+
+def _index_valid(db, name):
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s);", (name,))
+        row = cur.fetchone()
+        cur.close()
+    return row[0] if row else None
+
+
+def test_migrations_are_idempotent_and_rebuild_invalid_indexes(db):
+    assert _index_valid(db, "idx_production_log_date") is True
+
+    # What an interrupted CREATE INDEX CONCURRENTLY leaves behind
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE pg_index SET indisvalid = FALSE
+            WHERE indexrelid = 'idx_production_log_date'::regclass;
+        """)
+        conn.commit()
+        cur.close()
+
+    migrations.run_migrations()
+
+    assert _index_valid(db, "idx_production_log_date") is True
@@ -0,0 +1,121 @@
+import threading
+
+import psycopg2
+import pytest
+
+import config
+from tools import outbox
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Capture delivered messages instead of talking to an SMTP server"""
+    messages = []
+
+    def send_bulk(batch):
+        messages.extend(batch)
+        return [True] * len(batch)
+
+    monkeypatch.setattr(outbox.email_tool, "send_bulk", send_bulk)
+    return messages
+
+
+def _enqueue(db, *recipients):
+    outbox.ensure_outbox_table()
+
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        for recipient in recipients:
+            outbox.enqueue_email(cur, recipient, "Subject", "Body")
+        conn.commit()
+        cur.close()
+
+
+def _expire_leases(db):
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("UPDATE email_outbox SET next_attempt_at = NOW() - INTERVAL '1 second';")
+        conn.commit()
+        cur.close()
+
+
+def _statuses(db):
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT recipient_email, status, attempts FROM email_outbox ORDER BY outbox_id;")
+        rows = cur.fetchall()
+        cur.close()
+    return rows
+
+
+def test_claimed_rows_are_leased_until_they_expire(db):
+    _enqueue(db, "a@example.com", "b@example.com")
+
+    claimed = outbox._claim_batch(10)
+
+    assert [row[2] for row in claimed] == ["a@example.com", "b@example.com"]
+    assert outbox._claim_batch(10) == []
+
+    _expire_leases(db)
+    reclaimed = outbox._claim_batch(10)
+
+    assert [row[1] for row in reclaimed] == [row[1] for row in claimed]
+
+
+def test_resend_after_a_crash_reuses_the_message_id(db, sent, monkeypatch):
+    _enqueue(db, "a@example.com")
+
+    def crash(rows, bodies, results):
+        raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    with monkeypatch.context() as m:
+        m.setattr(outbox, "_record_results", crash)
+
+        with pytest.raises(psycopg2.OperationalError):
+            outbox.drain_outbox()
+
+    assert _statuses(db) == [("a@example.com", "SENDING", 0)]
+
+    _expire_leases(db)
+    assert outbox.drain_outbox() == (1, 0)
+
+    assert len(sent) == 2
+    assert sent[0]["Message-ID"] == sent[1]["Message-ID"]
+    assert _statuses(db) == [("a@example.com", "SENT", 1)]
+
+
+def test_failed_delivery_backs_off_until_max_attempts(db, monkeypatch):
+    monkeypatch.setattr(config, "OUTBOX_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(outbox.email_tool, "send_bulk", lambda batch: [False] * len(batch))
+    _enqueue(db, "a@example.com")
+
+    assert outbox.drain_outbox() == (0, 1)
+    assert _statuses(db) == [("a@example.com", "PENDING", 1)]
+    assert outbox.drain_outbox() == (0, 0)
+
+    _expire_leases(db)
+    assert outbox.drain_outbox() == (0, 1)
+    assert _statuses(db) == [("a@example.com", "FAILED", 2)]
+
+
+def test_worker_keeps_running_through_database_errors(monkeypatch):
+    stop = threading.Event()
+    calls = []
+
+    def drain_outbox():
+        calls.append(1)
+
+        if len(calls) < 3:
+            raise psycopg2.OperationalError("could not connect to server")
+
+        stop.set()
+        return 0, 0
+
+    monkeypatch.setattr(outbox, "drain_outbox", drain_outbox)
+
+    worker = threading.Thread(target=outbox.run_outbox_worker, args=(stop, 0.01))
+    worker.start()
+    worker.join(timeout=5)
+
+    assert not worker.is_alive()
+    assert len(calls) == 3
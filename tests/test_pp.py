@@ -0,0 +1,112 @@
+import metrics
+import pp
+from tools import outbox
+
+
+def _execute(db, sql, params=None):
+    with db.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall() if cur.description else None
+        conn.commit()
+        cur.close()
+    return rows
+
+
+def _catalog(db):
+    """Two low-stock items (1, 2), one stocked item (3); vendor 1 supplies all, vendor 2 only item 1"""
+    _execute(db, """
+        INSERT INTO inventory (item_name, current_stock, reorder_level, unit_price) VALUES
+            ('gears', 10, 50, 2.00), ('bolts', 0, 100, 0.50), ('nuts', 500, 100, 0.10);
+        INSERT INTO vendors (vendor_name, vendor_email, lead_time_days, is_approved) VALUES
+            ('Acme', 'sales@acme.example', 5, TRUE),
+            ('Bolt Co', 'rfq@boltco.example', 3, TRUE),
+            ('Unapproved', 'x@unapproved.example', 1, FALSE);
+        INSERT INTO inventory_vendors (item_id, vendor_id, unit_price, rating) VALUES
+            (1, 1, 2.00, 4.0), (1, 2, 1.90, 4.5), (2, 1, 0.50, 4.0), (3, 1, 0.10, 4.0), (1, 3, 1.00, 5.0);
+    """)
+
+
+def test_vendors_for_many_items_come_back_best_rated_first(db):
+    _catalog(db)
+
+    vendors = pp.get_preapproved_vendors_for_items([1, 2, 99])
+
+    assert [v[1] for v in vendors[1]] == ["Bolt Co", "Acme"]
+    assert [v[1] for v in vendors[2]] == ["Acme"]
+    assert 99 not in vendors
+    assert pp.get_preapproved_vendors_for_items([]) == {}
+
+
+def test_rfq_vendor_lookup_is_one_query_for_all_items(db):
+    _catalog(db)
+    outbox.ensure_outbox_table()
+    before = metrics.get_histogram("db_query_duration_seconds", query="select vendors")["count"]
+
+    result = pp.send_rfq_to_vendors({"trend_percent": 0})
+
+    assert result["rfqs_sent"] == 3
+    assert metrics.get_histogram("db_query_duration_seconds", query="select vendors")["count"] == before + 1
+
+
+def _rfq(db, rfq_number, vendor_id, age_days, status="PENDING"):
+    return _execute(db, """
+        INSERT INTO rfqs (item_id, vendor_id, rfq_number, required_qty, status, created_date)
+        VALUES (1, %s, %s, 40, %s, NOW() - %s * INTERVAL '1 day')
+        RETURNING rfq_id;
+    """, (vendor_id, rfq_number, status, age_days))[0][0]
+
+
+def _quote(db, rfq_id, vendor_id, price):
+    return _execute(db, """
+        INSERT INTO vendor_quotes (rfq_id, vendor_id, quote_price, delivery_days)
+        VALUES (%s, %s, %s, 5)
+        RETURNING quote_id;
+    """, (rfq_id, vendor_id, price))[0][0]
+
+
+def test_quote_intake_marks_aged_rfqs_quoted_in_one_statement(db):
+    _catalog(db)
+    older = _rfq(db, "RFQ-OLD", 1, 3)
+    newer = _rfq(db, "RFQ-NEW", 2, 2)
+    fresh = _rfq(db, "RFQ-FRESH", 1, 0)
+    done = _rfq(db, "RFQ-DONE", 1, 5, status="QUOTED")
+    _rfq(db, "RFQ-NO-QUOTE", 2, 4)
+
+    first = _quote(db, newer, 2, 1.80)
+    _quote(db, newer, 2, 1.70)
+    oldest = _quote(db, older, 1, 2.10)
+    _quote(db, fresh, 1, 2.00)
+    _quote(db, done, 1, 2.00)
+
+    before = metrics.get_histogram("db_query_duration_seconds", query="update rfqs")["count"]
+    result = pp.check_for_quotes_inbox()
+
+    assert metrics.get_histogram("db_query_duration_seconds", query="update rfqs")["count"] == before + 1
+    assert [(q["rfq_number"], q["quote_id"]) for q in result["quote_details"]] == [
+        ("RFQ-OLD", oldest), ("RFQ-NEW", first)
+    ]
+    assert result["quotes_received"] == 2
+    assert _execute(db, "SELECT rfq_number, status FROM rfqs ORDER BY rfq_id;") == [
+        ("RFQ-OLD", "QUOTED"), ("RFQ-NEW", "QUOTED"), ("RFQ-FRESH", "PENDING"),
+        ("RFQ-DONE", "QUOTED"), ("RFQ-NO-QUOTE", "PENDING"),
+    ]
+
+
+def test_each_vendor_gets_one_rfq_email_for_all_its_items(db):
+    _catalog(db)
+    outbox.ensure_outbox_table()
+
+    result = pp.send_rfq_to_vendors({"trend_percent": 0})
+
+    assert result["vendors_contacted"] == 2
+    assert sorted((d["vendor_name"], d["item_name"]) for d in result["details"]) == [
+        ("Acme", "bolts"), ("Acme", "gears"), ("Bolt Co", "gears")
+    ]
+
+    emails = dict(_execute(db, "SELECT recipient_email, body FROM email_outbox;"))
+    rfq_numbers = [row[0] for row in _execute(db, "SELECT rfq_number FROM rfqs WHERE vendor_id = 1;")]
+
+    assert set(emails) == {"sales@acme.example", "rfq@boltco.example"}
+    assert all(number in emails["sales@acme.example"] for number in rfq_numbers)
+    assert "bolts" not in emails["rfq@boltco.example"]
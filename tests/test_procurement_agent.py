@@ -0,0 +1,43 @@
+import threading
+import time
+
+from agents import procurement_agent
+
+
+def _rows(*vendors):
+    return [(f"item-{i}", 0, 10, vendor, 2.5) for i, vendor in enumerate(vendors)]
+
+
+def test_vendor_orders_run_concurrently_up_to_the_limit(monkeypatch):
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def generate_vendor_email(vendor_email, items):
+        with lock:
+            active.append(vendor_email)
+            peak.append(len(active))
+
+        time.sleep(0.1)
+
+        with lock:
+            active.remove(vendor_email)
+
+        if vendor_email == "broken@example.com":
+            raise RuntimeError("LLM unavailable")
+        return f"PO for {vendor_email}: {len(items)} items"
+
+    vendors = ["a@example.com", "broken@example.com", "b@example.com", "b@example.com", "c@example.com"]
+    monkeypatch.setattr(procurement_agent, "get_low_stock_items", lambda: _rows(*vendors))
+    monkeypatch.setattr(procurement_agent, "generate_vendor_email", generate_vendor_email)
+    monkeypatch.setattr(procurement_agent, "log_decision", lambda **decision: None)
+
+    output = procurement_agent.run_procurement_cycle(max_concurrency=2)
+
+    # Failing vendors are skipped; the rest keep their order
+    assert output == {
+        "a@example.com": "PO for a@example.com: 1 items",
+        "b@example.com": "PO for b@example.com: 2 items",
+        "c@example.com": "PO for c@example.com: 1 items",
+    }
+    assert max(peak) == 2
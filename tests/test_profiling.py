@@ -0,0 +1,59 @@
+import sys
+import threading
+import time
+
+import profiling
+
+
+def _busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def test_concurrent_profiled_threads_each_get_a_bucket(tmp_path):
+    barrier = threading.Barrier(2, timeout=2)
+    errors = []
+
+    def agent(name):
+        try:
+            with profiling.profiled(name):
+                barrier.wait()
+                _busy(0.2)
+        except Exception as e:
+            errors.append(e)
+
+    with profiling.session(output_dir=str(tmp_path)):
+        threads = [threading.Thread(target=agent, args=(name,)) for name in ("analyst", "logistics")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert errors == []
+    assert (tmp_path / "analyst.collapsed").exists()
+    assert (tmp_path / "logistics.collapsed").exists()
+
+    if sys.version_info >= (3, 12):
+        assert (tmp_path / "process.pstats").exists()
+    else:
+        assert (tmp_path / "analyst.pstats").exists()
+        assert (tmp_path / "logistics.pstats").exists()
+
+
+def test_failed_enable_leaves_no_bookkeeping_behind(monkeypatch, tmp_path):
+    class BusyProfile:
+        def enable(self):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(profiling, "_PROCESS_WIDE_CPROFILE", False)
+    monkeypatch.setattr(profiling.cProfile, "Profile", BusyProfile)
+
+    with profiling.session("cprofile", str(tmp_path)):
+        with profiling.profiled("analyst"):
+            ran = True
+
+        assert profiling._session["threads"] == {}
+        assert profiling._current_agent.get() is None
+
+    assert ran
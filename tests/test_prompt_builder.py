@@ -0,0 +1,38 @@
+import config
+import metrics
+import prompt_builder
+
+
+def test_tables_are_trimmed_to_the_family_budget(monkeypatch):
+    monkeypatch.setitem(config.PROMPT_TOKEN_BUDGETS, "test_family", 100)
+    rows = [{"item": f"item-{i}", "qty": i} for i in range(200)]
+
+    prompt = prompt_builder.build_prompt("test_family", "Header {note}\n{rows}", tables={"rows": rows}, note="x")
+
+    assert prompt_builder.estimate_tokens(prompt) <= 100
+    assert "item-0 | 0" in prompt
+    assert "more rows omitted" in prompt
+
+
+def test_small_tables_are_kept_whole(monkeypatch):
+    monkeypatch.setitem(config.PROMPT_TOKEN_BUDGETS, "test_family", 1000)
+    rows = [{"item": "a", "qty": 1}, {"item": "b", "qty": 2.5}]
+
+    prompt = prompt_builder.build_prompt("test_family", "{rows}", tables={"rows": rows})
+
+    assert prompt == "item | qty\na | 1\nb | 2.50"
+
+
+def test_prompt_stats_are_exported_per_family(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "_stats", {})
+    monkeypatch.setitem(config.PROMPT_TOKEN_BUDGETS, "test_family", 10)
+
+    prompt_builder.record_prompt("test_family", "x" * 20)
+    prompt_builder.record_prompt("test_family", "x" * 60)
+
+    text = metrics.render_prometheus()
+
+    assert prompt_builder.get_prompt_stats()["test_family"]["tokens_avg"] == 10.0
+    assert 'prompt_tokens_avg{family="test_family"} 10.0' in text
+    assert 'prompt_tokens_max{family="test_family"} 15' in text
+    assert 'prompts_over_budget_total{family="test_family"} 1' in text
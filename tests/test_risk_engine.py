@@ -0,0 +1,48 @@
+import datetime
+
+from agents import risk_engine
+
+TODAY = datetime.date(2026, 3, 10)
+
+
+def _flag(item, days_late, quantity=10, carrier="FastFreight"):
+    arrival = TODAY - datetime.timedelta(days=days_late)
+    return {"item_name": item, "expected_arrival": arrival, "quantity": quantity, "carrier": carrier, "status": "In Transit"}
+
+
+def test_late_low_stock_shipments_rank_first():
+    flags = [_flag("bolts", 0), _flag("gears", 7, quantity=50)]
+    stock = {"bolts": (1000, 100), "gears": (20, 100)}
+    carriers = {"FastFreight": {"shipments": 2, "overdue": 1}}
+
+    ranked = risk_engine.rank_shipment_risks(flags, stock, carriers, today=TODAY)
+
+    assert [s["item_name"] for s in ranked] == ["gears", "bolts"]
+    assert ranked[0]["risk_score"] == 90.0  # 50 lateness + 10 carrier + 30 stock
+    assert ranked[0]["days_late"] == 7
+
+
+def test_summarize_risks_counts_late_quantity():
+    ranked = risk_engine.rank_shipment_risks(
+        [_flag("a", 2, quantity=5), _flag("b", -3, quantity=7)], {}, {}, today=TODAY
+    )
+    summary = risk_engine.summarize_risks(ranked)
+
+    assert summary["open_shipments"] == 2
+    assert summary["late_shipments"] == 1
+    assert summary["quantity_late"] == 5
+    assert summary["quantity_in_transit"] == 12
+
+
+def test_top_shipment_risks_streams_flags_into_a_bounded_top_n():
+    flags = (_flag(f"item{days}", days, quantity=days + 1) for days in range(-2, 8))
+
+    top, summary = risk_engine.top_shipment_risks(flags, {}, {}, top_n=3, today=TODAY)
+    ranked = risk_engine.rank_shipment_risks(
+        [_flag(f"item{days}", days, quantity=days + 1) for days in range(-2, 8)], {}, {}, today=TODAY
+    )
+
+    assert top == ranked[:3]
+    assert summary == risk_engine.summarize_risks(ranked)
+    assert summary["open_shipments"] == 10
+    assert summary["max_risk_score"] == ranked[0]["risk_score"]
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import config
+import tracing
+
+
+@pytest.fixture
+def trace_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "TRACING_ENABLED", True)
+    monkeypatch.setattr(config, "TRACE_EXPORT_ENABLED", True)
+    monkeypatch.setattr(config, "TRACE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def _exported_spans(path):
+    with open(path) as f:
+        document = json.load(f)
+    return document["resourceSpans"][0]["scopeSpans"][0]["spans"]
+
+
+def test_trace_exports_root_and_child_spans(trace_dir):
+    with tracing.trace("cycle") as root:
+        with tracing.span("step"):
+            pass
+
+    spans = _exported_spans(root.export_path)
+    assert sorted(s["name"] for s in spans) == ["cycle", "step"]
+
+
+def test_failed_trace_is_still_exported(trace_dir):
+    with pytest.raises(RuntimeError):
+        with tracing.trace("cycle") as root:
+            with tracing.span("step"):
+                raise RuntimeError("boom")
+
+    spans = {s["name"]: s for s in _exported_spans(root.export_path)}
+    assert set(spans) == {"cycle", "step"}
+    assert spans["cycle"]["status"]["code"] == 2
+
+
+def test_nested_trace_is_not_exported_separately(trace_dir):
+    with tracing.trace("cycle"):
+        with tracing.trace("job") as inner:
+            pass
+
+    assert inner.export_path is None
+    assert len(list(trace_dir.iterdir())) == 1
@@ -0,0 +1,138 @@
+import atexit
+import queue
+import smtplib
+import threading
+from contextlib import contextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import config
+import metrics
+import tracing
+
+_idle = queue.LifoQueue()
+_slots = threading.BoundedSemaphore(config.SMTP_POOL_SIZE)
+
+
+def build_message(recipient_email, subject, body):
+    msg = MIMEMultipart()
+    msg['From'] = config.SENDER_EMAIL
+    msg['To'] = recipient_email
+    msg['Subject'] = subject
+
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+def _open_session():
+    server = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT, timeout=config.SMTP_TIMEOUT_SECONDS)
+
+    if config.SMTP_USE_TLS:
+        server.starttls()
+
+    if config.SENDER_PASSWORD:
+        server.login(config.SENDER_EMAIL, config.SENDER_PASSWORD)
+
+    server.messages_sent = 0
+    return server
+
+
+def _close_session(server):
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+
+@contextmanager
+def smtp_session():
+    """Check out an authenticated SMTP session from the pool"""
+    _slots.acquire()
+    server = None
+
+    try:
+        try:
+            server = _idle.get_nowait()
+        except queue.Empty:
+            server = _open_session()
+
+        yield server
+    except Exception:
+        # A session that raised mid-conversation cannot be trusted again
+        if server is not None:
+            server.close()
+        server = None
+        raise
+    finally:
+        if server is not None:
+            if server.messages_sent >= config.SMTP_MAX_MESSAGES_PER_SESSION:
+                _close_session(server)
+            else:
+                _idle.put(server)
+        _slots.release()
+
+
+def send_bulk(messages):
+    """Send messages over pooled sessions, reconnecting on dropped connections
+
+    Returns a list of booleans in the same order as messages.
+    """
+    with tracing.span("smtp.send", {"email.messages": len(messages)}) as span:
+        results = _send_with_retries(messages)
+        span.set_attributes({"email.sent": sum(results), "email.failed": len(results) - sum(results)})
+
+    metrics.inc("emails_total", sum(results), outcome="sent")
+    metrics.inc("emails_total", len(results) - sum(results), outcome="failed")
+
+    return results
+
+
+def _send_with_retries(messages):
+    results = [False] * len(messages)
+    remaining = list(range(len(messages)))
+    attempts = 0
+
+    while remaining and attempts <= config.SMTP_SEND_RETRIES:
+        attempts += 1
+        batch = remaining[:config.SMTP_MAX_MESSAGES_PER_SESSION]
+        sent = []
+
+        try:
+            with smtp_session() as server:
+                for index in batch:
+                    msg = messages[index]
+                    try:
+                        server.send_message(msg)
+                        server.messages_sent += 1
+                        results[index] = True
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                            smtplib.SMTPDataError) as e:
+                        # Rejected by the server: retrying will not help
+                        print(f"Error sending email to {msg['To']}: {e}")
+                    sent.append(index)
+        except (smtplib.SMTPException, OSError) as e:
+            print(f"SMTP session failed, reconnecting: {e}")
+        else:
+            attempts = 0
+
+        sent = set(sent)
+        remaining = [index for index in remaining if index not in sent]
+
+    return results
+
+
+def send_email(recipient_email, subject, body):
+    """Send one email over a pooled SMTP session"""
+    return send_bulk([build_message(recipient_email, subject, body)])[0]
+
+
+def close_all():
+    """Quit every idle SMTP session"""
+    while True:
+        try:
+            _close_session(_idle.get_nowait())
+        except queue.Empty:
+            break
+
+
+atexit.register(close_all)
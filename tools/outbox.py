@@ -0,0 +1,211 @@
+import threading
+import uuid
+from email.utils import make_msgid
+
+import config
+from database import db_connection, ensure_schema
+from llm_gateway import invoke
+from prompt_builder import build_prompt
+from tools import email_tool
+
+OUTBOX_DDL = """
+    CREATE TABLE IF NOT EXISTS email_outbox (
+        outbox_id BIGSERIAL PRIMARY KEY,
+        message_id TEXT NOT NULL UNIQUE,
+        recipient_email TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'PENDING',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        last_error TEXT,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        sent_at TIMESTAMP,
+        polish_family TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_email_outbox_due
+        ON email_outbox (next_attempt_at)
+        WHERE status IN ('PENDING', 'SENDING');
+"""
+
+
+def ensure_outbox_table():
+    ensure_schema("email_outbox", OUTBOX_DDL)
+
+
+def enqueue_email(cur, recipient_email, subject, body, polish_family=None):
+    """Queue an email using the caller's cursor, so it commits with the caller's records
+
+    With polish_family set, the worker runs the body through the LLM
+    before sending, keeping that latency off the caller's path. Call
+    ensure_outbox_table() once beforehand, outside the caller's transaction.
+    """
+    # The Message-ID is fixed at enqueue time, so a resend after a crash
+    # carries the same ID and receiving servers can drop the duplicate
+    message_id = make_msgid(idstring=uuid.uuid4().hex, domain=config.SENDER_EMAIL.split("@")[-1])
+
+    cur.execute("""
+        INSERT INTO email_outbox (message_id, recipient_email, subject, body, polish_family)
+        VALUES (%s, %s, %s, %s, %s)
+        RETURNING outbox_id;
+    """, (message_id, recipient_email, subject, body, polish_family))
+
+    return cur.fetchone()[0]
+
+
+def polish_body(body, family):
+    """LLM rewrite of a template-rendered email; falls back to the template on failure"""
+    prompt = build_prompt(f"{family}_polish", """
+Rewrite the following business email so it reads naturally and professionally.
+Keep every number, date, item, reference and email address exactly as written.
+Return only the email body.
+
+{body}
+""", body=body)
+
+    try:
+        return invoke(prompt, family=f"{family}_polish")
+    except Exception as e:
+        print(f"Error polishing {family} email, sending template: {e}")
+        return body
+
+
+def _backoff_seconds(attempts):
+    return min(config.OUTBOX_BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), config.OUTBOX_BACKOFF_MAX_SECONDS)
+
+
+def _claim_batch(batch_size):
+    """Lease due rows to this worker in a short transaction; returns the claimed rows
+
+    A claimed row is SENDING until its lease (next_attempt_at) expires, so
+    rows held by a worker that crashed become due again without any locks
+    being held while the batch is polished and sent.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            cur.execute("""
+                UPDATE email_outbox o
+                SET status = 'SENDING', next_attempt_at = NOW() + make_interval(secs => %s)
+                FROM (
+                    SELECT outbox_id
+                    FROM email_outbox
+                    WHERE status IN ('PENDING', 'SENDING') AND next_attempt_at <= NOW()
+                    ORDER BY outbox_id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                ) due
+                WHERE o.outbox_id = due.outbox_id
+                RETURNING o.outbox_id, o.message_id, o.recipient_email, o.subject, o.body,
+                          o.attempts, o.polish_family;
+            """, (config.OUTBOX_CLAIM_LEASE_SECONDS, batch_size))
+
+            rows = sorted(cur.fetchall())
+            conn.commit()
+            return rows
+        except Exception as e:
+            print(f"Error claiming outbox batch: {e}")
+            conn.rollback()
+            return []
+        finally:
+            cur.close()
+
+
+def _record_results(rows, bodies, results):
+    """Mark a sent batch SENT, or back off / fail each undelivered row"""
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            for row, body, ok in zip(rows, bodies, results):
+                outbox_id, _, recipient_email, _, _, attempts, _ = row
+                attempts += 1
+
+                if ok:
+                    cur.execute("""
+                        UPDATE email_outbox
+                        SET status = 'SENT', sent_at = NOW(), attempts = %s,
+                            body = %s, polish_family = NULL
+                        WHERE outbox_id = %s;
+                    """, (attempts, body, outbox_id))
+                    continue
+
+                # Keep the polished text so a retry does not polish again
+                cur.execute("""
+                    UPDATE email_outbox
+                    SET status = %s, attempts = %s, last_error = %s, body = %s, polish_family = NULL,
+                        next_attempt_at = NOW() + make_interval(secs => %s)
+                    WHERE outbox_id = %s;
+                """, ('FAILED' if attempts >= config.OUTBOX_MAX_ATTEMPTS else 'PENDING',
+                      attempts, f"Delivery to {recipient_email} failed", body,
+                      _backoff_seconds(attempts), outbox_id))
+
+            conn.commit()
+        except Exception as e:
+            # The lease expires and the rows are retried with the same Message-ID
+            print(f"Error recording outbox results: {e}")
+            conn.rollback()
+        finally:
+            cur.close()
+
+
+def drain_outbox(batch_size=None):
+    """Send one batch of due emails; returns (sent, failed) counts
+
+    Claim, polish and send, then record: no transaction or row lock is
+    held while the LLM or the SMTP server is working.
+    """
+    ensure_outbox_table()
+
+    rows = _claim_batch(batch_size or config.OUTBOX_BATCH_SIZE)
+
+    if not rows:
+        return 0, 0
+
+    bodies = []
+    messages = []
+
+    for outbox_id, message_id, recipient_email, subject, body, attempts, family in rows:
+        if family:
+            body = polish_body(body, family)
+
+        msg = email_tool.build_message(recipient_email, subject, body)
+        msg['Message-ID'] = message_id
+        bodies.append(body)
+        messages.append(msg)
+
+    results = email_tool.send_bulk(messages)
+    _record_results(rows, bodies, results)
+
+    sent = sum(results)
+    return sent, len(results) - sent
+
+
+def run_outbox_worker(stop_event=None, poll_seconds=None):
+    """Drain the outbox until stop_event is set, sleeping when it is empty
+
+    A failed drain (database restart, pool timeout) is logged and retried
+    with a growing pause, so queued mail is not stranded behind a dead worker.
+    """
+    stop_event = stop_event or threading.Event()
+    poll_seconds = poll_seconds or config.OUTBOX_POLL_SECONDS
+    errors = 0
+
+    while not stop_event.is_set():
+        try:
+            sent, failed = drain_outbox()
+        except Exception as e:
+            errors += 1
+            delay = min(poll_seconds * (2 ** (errors - 1)), config.OUTBOX_ERROR_BACKOFF_MAX_SECONDS)
+            print(f"Error draining outbox, retrying in {delay:.0f}s: {e}")
+            stop_event.wait(delay)
+            continue
+
+        errors = 0
+
+        if sent or failed:
+            print(f"Outbox: {sent} sent, {failed} failed")
+        else:
+            stop_event.wait(poll_seconds)
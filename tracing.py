@@ -0,0 +1,246 @@
+import collections
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+
+# Spans follow the OpenTelemetry data model (trace/span/parent ids, unix-nano
+# timestamps, attributes, status) and export as OTLP JSON, without needing
+# the OpenTelemetry SDK at runtime
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+_finished = collections.deque(maxlen=config.TRACE_MAX_SPANS)
+_finished_lock = threading.Lock()
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = "UNSET"
+        self.status_message = None
+        self.export_path = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes):
+        self.attributes.update(attributes)
+
+    def record_error(self, error):
+        self.status = "ERROR"
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+
+        self.end_ns = time.time_ns()
+
+        with _finished_lock:
+            _finished.append(self)
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled"""
+
+    trace_id = None
+    span_id = None
+    parent_id = None
+    export_path = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def record_error(self, error):
+        pass
+
+    def end(self):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def current_span():
+    return _current_span.get()
+
+
+def start_span(name, attributes=None, **kwargs):
+    """Start a span under the current one without making it current; call end() when done
+
+    For work whose lifetime does not nest cleanly, such as a connection held
+    open by a suspended generator.
+    """
+    if not config.TRACING_ENABLED:
+        return _NOOP_SPAN
+
+    return Span(name, _current_span.get(), {**(attributes or {}), **kwargs})
+
+
+@contextmanager
+def span(name, attributes=None, **kwargs):
+    """Time the enclosed block as a child of the current span"""
+    if not config.TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+
+    current = Span(name, _current_span.get(), {**(attributes or {}), **kwargs})
+    token = _current_span.set(current)
+
+    try:
+        yield current
+    except BaseException as e:
+        current.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+@contextmanager
+def trace(name, attributes=None, **kwargs):
+    """Like span, but a span that starts a new trace also exports it to TRACE_DIR on exit
+
+    The export runs even when the block raises, so failed runs are kept too.
+    """
+    root = None
+
+    try:
+        with span(name, attributes, **kwargs) as root:
+            yield root
+    finally:
+        if root is not None and root.trace_id and root.parent_id is None and config.TRACE_EXPORT_ENABLED:
+            root.export_path = export_trace(root.trace_id)
+
+
+def propagate(func):
+    """Bind func to a copy of the current context so spans opened on a worker thread keep their parent
+
+    Wrap once per submission: a copied context cannot run on two threads at once.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        return context.run(func, *args, **kwargs)
+
+    return run
+
+
+def get_finished_spans(trace_id=None):
+    with _finished_lock:
+        spans = list(_finished)
+
+    if trace_id is not None:
+        spans = [s for s in spans if s.trace_id == trace_id]
+    return spans
+
+
+def clear():
+    with _finished_lock:
+        _finished.clear()
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes):
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def _otlp_span(s):
+    otlp = {
+        "traceId": s.trace_id,
+        "spanId": s.span_id,
+        "name": s.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(s.start_ns),
+        "endTimeUnixNano": str(s.end_ns),
+        "attributes": _otlp_attributes(s.attributes),
+        "status": {"code": {"UNSET": 0, "OK": 1, "ERROR": 2}[s.status]},
+    }
+
+    if s.parent_id:
+        otlp["parentSpanId"] = s.parent_id
+    if s.status_message:
+        otlp["status"]["message"] = s.status_message
+    return otlp
+
+
+def export_trace(trace_id, path=None):
+    """Write a trace's finished spans as OTLP JSON and return the file path"""
+    path = path or os.path.join(config.TRACE_DIR, f"trace-{trace_id}.json")
+
+    document = {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": config.TRACE_SERVICE_NAME})},
+            "scopeSpans": [{
+                "scope": {"name": "tracing"},
+                "spans": [_otlp_span(s) for s in get_finished_spans(trace_id)],
+            }],
+        }]
+    }
+
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        with open(path, "w") as f:
+            json.dump(document, f)
+    except OSError as e:
+        print(f"Error exporting trace {trace_id}: {e}")
+        return None
+
+    return path
+
+
+def waterfall(trace_id):
+    """Flat rows (start order, with nesting depth) describing a trace, for charts and storage"""
+    spans = sorted(get_finished_spans(trace_id), key=lambda s: s.start_ns)
+
+    if not spans:
+        return []
+
+    trace_start = spans[0].start_ns
+    depths = {}
+    rows = []
+
+    for s in spans:
+        depth = depths.get(s.parent_id, -1) + 1
+        depths[s.span_id] = depth
+
+        rows.append({
+            "name": s.name,
+            "kind": s.name.split(".", 1)[0],
+            "depth": depth,
+            "start_ms": round((s.start_ns - trace_start) / 1e6, 3),
+            "end_ms": round((s.end_ns - trace_start) / 1e6, 3),
+            "duration_ms": round((s.end_ns - s.start_ns) / 1e6, 3),
+            "status": s.status,
+            "attributes": {key: str(value) for key, value in s.attributes.items()},
+        })
+
+    return rows
@@ -1,16 +1,33 @@
 import streamlit as st
-from workflows.system_cycle import run_full_operations_cycle
-from agents.analyst_agent import run_analysis_cycle
-from agents.procurement_agent import run_procurement_cycle
-from agents.logistics_agent import run_logistics_cycle
+import config
+import metrics
+from database import get_pool_stats
+from llm_cache import get_cache_stats
+from prompt_builder import get_prompt_stats
+from workflows.jobs import start_job, running_jobs, live_output
+from live_output import section_title
+from workflows.results_store import load_latest_result, load_latest_failure
 
 st.set_page_config(page_title="AI Operations Command Center", layout="wide")
 
+# No-op unless METRICS_PORT is set; started once per server process
+metrics.start_http_server()
+
 st.title("AI Operations Command Center")
 st.caption("Agent-Based Manufacturing Intelligence System")
 
 st.markdown("---")
 
+# Runs happen in background jobs and land in the cycle_results table,
+# so page loads only read the latest stored result for each agent.
+
+JOB_LABELS = {
+    "analyst": "Analyst Agent",
+    "procurement": "Procurement Agent",
+    "logistics": "Logistics Agent",
+    "full_cycle": "Full System (Phase 2)",
+}
+
 # ==============================
 # BUTTON SECTION
 # ==============================
@@ -25,146 +42,304 @@ with col2:
     run_logistics = st.button("Run Logistics Agent")
     run_full = st.button("Run Full System (Phase 2)")
 
+for job_name, clicked in (
+    ("analyst", run_analyst),
+    ("procurement", run_procurement),
+    ("logistics", run_logistics),
+    ("full_cycle", run_full),
+):
+    if clicked:
+        status = start_job(job_name)
+
+        if status == "running":
+            st.toast(f"{JOB_LABELS[job_name]} is already running")
+        elif status == "running_elsewhere":
+            st.toast(f"{JOB_LABELS[job_name]} is already running elsewhere")
+        elif status == "failed":
+            st.toast(f"{JOB_LABELS[job_name]} could not be started; see the server log")
+
+        st.session_state["awaiting_jobs"] = True
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def cached_latest_result(job_name):
+    return load_latest_result(job_name)
+
+
+@st.cache_data(ttl=5, show_spinner=False)
+def cached_latest_failure(job_name):
+    return load_latest_failure(job_name)
+
+
+@st.fragment(run_every=2)
+def job_status_panel():
+    running = running_jobs()
+
+    if running:
+        for job_name, started_at in running.items():
+            st.info(f"{JOB_LABELS[job_name]} running since {started_at:%H:%M:%S}...")
+    elif st.session_state.get("awaiting_jobs"):
+        # Finished: clear cached reads and redraw the whole page
+        st.session_state["awaiting_jobs"] = False
+        cached_latest_result.clear()
+        cached_latest_failure.clear()
+        st.rerun()
+
+
+job_status_panel()
+
+
+@st.fragment(run_every=1)
+def live_output_panel():
+    # Show what running jobs in this process have generated so far; never
+    # wait on the job, so the page and the stored results render at once
+    for job_name in running_jobs():
+        live = live_output(job_name)
+
+        if live is None:
+            continue
+
+        st.subheader(f"Live: {JOB_LABELS[job_name]}")
+
+        for section, text, closed in live.snapshot():
+            st.markdown(f"**{section_title(section)}**")
+            st.markdown(text if closed else text + " ▌")
+
+
+live_output_panel()
+
 st.markdown("---")
 
+
+def show_run_info(job_name, finished_at):
+    error, failed_at = cached_latest_failure(job_name)
+
+    if error and (finished_at is None or failed_at > finished_at):
+        st.error(f"Last run failed at {failed_at:%Y-%m-%d %H:%M}: {error}")
+
+    if finished_at is None:
+        st.caption(f"No completed {JOB_LABELS[job_name]} run yet.")
+    else:
+        st.caption(f"Last completed {finished_at:%Y-%m-%d %H:%M:%S}")
+
+
+def show_trace_waterfall(trace):
+    if not trace:
+        return
+
+    with st.expander("⏱️ Trace waterfall"):
+        rows = [
+            {**span, "label": f"{index + 1:>3}. {'  ' * span['depth']}{span['name']}"}
+            for index, span in enumerate(trace)
+        ]
+
+        st.vega_lite_chart(rows, {
+            "mark": {"type": "bar", "height": 10},
+            "height": max(len(rows) * 14, 80),
+            "encoding": {
+                "y": {"field": "label", "type": "ordinal", "sort": None, "title": None},
+                "x": {"field": "start_ms", "type": "quantitative", "title": "ms since cycle start"},
+                "x2": {"field": "end_ms"},
+                "color": {"field": "kind", "type": "nominal", "title": "Span"},
+                "tooltip": [
+                    {"field": "name"},
+                    {"field": "duration_ms", "title": "duration (ms)"},
+                    {"field": "status"},
+                    {"field": "attributes.db\\.statement", "title": "statement"},
+                    {"field": "attributes.llm\\.family", "title": "prompt family"},
+                ],
+            },
+        }, use_container_width=True)
+
+
+def show_system_health():
+    # Counters live in this dashboard process, which also runs the jobs
+    pool = get_pool_stats()
+
+    st.markdown("**Database pool**")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Connections in use", pool["in_use"])
+    col2.metric("Avg pool wait", f"{pool['wait_seconds_avg'] * 1000:.1f} ms")
+    col3.metric("Avg checkout", f"{pool['checkout_seconds_avg'] * 1000:.1f} ms")
+    st.caption(f"{pool['checkouts']} checkouts, {pool['health_check_failures']} unhealthy connections replaced")
+
+    cache = get_cache_stats()
+
+    st.markdown("**LLM response cache**")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Hit rate", f"{cache['hit_rate'] * 100:.1f}%")
+    col2.metric("Entries in memory", cache["memory_entries"])
+    col3.metric("Disk hits", cache["disk_hits"])
+    st.caption(f"{cache['misses']} misses, {cache['expired']} expired, {cache['stores']} stored")
+
+    prompts = get_prompt_stats()
+
+    st.markdown("**Prompt sizes (estimated tokens)**")
+
+    if prompts:
+        st.dataframe(
+            [{"family": family, **stats} for family, stats in sorted(prompts.items())],
+            column_order=["family", "calls", "tokens_avg", "tokens_max", "over_budget"],
+            hide_index=True,
+            use_container_width=True
+        )
+    else:
+        st.caption("No prompts built yet.")
+
+
+def show_procurement(output):
+    if isinstance(output, str):
+        st.info(output)
+    else:
+        for vendor, email_text in output.items():
+            with st.expander(f"Purchase Order → {vendor}"):
+                st.markdown(email_text)
+
+
+full_tab, analyst_tab, procurement_tab, logistics_tab = st.tabs(
+    ["Full System", "Analyst", "Procurement", "Logistics"]
+)
+
 # ==============================
 # ANALYST AGENT
 # ==============================
 
-if run_analyst:
-    with st.spinner("Analyzing production logs..."):
-        result = run_analysis_cycle()
+with analyst_tab:
+    result, finished_at, trace = cached_latest_result("analyst")
+    show_run_info("analyst", finished_at)
+    show_trace_waterfall(trace)
 
-    st.success("Analyst Agent Complete")
+    if result:
+        st.header("📊 KPI Summary")
 
-    st.header("📊 KPI Summary")
+        col1, col2 = st.columns(2)
 
-    col1, col2 = st.columns(2)
+        with col1:
+            st.metric(f"Production Growth ({config.ANALYST_WINDOW_DAYS} Days)", f"{result['trend_percent']}%")
 
-    with col1:
-        st.metric("Production Growth (7 Days)", f"{result['trend_percent']}%")
+        with col2:
+            st.metric("Scrap Rate", f"{result['scrap_rate']}%")
 
-    with col2:
-        st.metric("Scrap Rate", f"{result['scrap_rate']}%")
-
-    st.header("🧠 Executive Summary")
-    st.markdown(result["summary"])
+        st.header("🧠 Executive Summary")
+        st.markdown(result["summary"])
 
 
 # ==============================
 # PROCUREMENT AGENT
 # ==============================
 
-if run_procurement:
-    with st.spinner("Evaluating inventory levels..."):
-        result = run_procurement_cycle()
+with procurement_tab:
+    result, finished_at, trace = cached_latest_result("procurement")
+    show_run_info("procurement", finished_at)
+    show_trace_waterfall(trace)
 
-    st.success("Procurement Agent Complete")
-
-    st.header("📦 Procurement Actions")
-
-    if isinstance(result, str):
-        st.info(result)
-    else:
-        for vendor, email_text in result.items():
-            with st.expander(f"Purchase Order → {vendor}"):
-                st.markdown(email_text)
+    if result:
+        st.header("📦 Procurement Actions")
+        show_procurement(result)
 
 
 # ==============================
 # LOGISTICS AGENT
 # ==============================
 
-if run_logistics:
-    with st.spinner("Evaluating shipment risks..."):
-        result = run_logistics_cycle()
+with logistics_tab:
+    result, finished_at, trace = cached_latest_result("logistics")
+    show_run_info("logistics", finished_at)
+    show_trace_waterfall(trace)
 
-    st.success("Logistics Agent Complete")
-
-    st.header("🚚 Logistics Risk Assessment")
-    st.markdown(result)
+    if result:
+        st.header("🚚 Logistics Risk Assessment")
+        st.markdown(result)
 
 
 # ==============================
 # FULL SYSTEM (PHASE 2)
 # ==============================
 
-if run_full:
-    with st.spinner("Running AI Operations Cycle..."):
-        result = run_full_operations_cycle()
-
-    st.success("AI Operations Cycle Complete")
+with full_tab:
+    result, finished_at, trace = cached_latest_result("full_cycle")
+    show_run_info("full_cycle", finished_at)
+    show_trace_waterfall(trace)
 
-    # ==============================
-    # KPI DASHBOARD
-    # ==============================
+    if result:
 
-    st.header("📊 Executive KPI Overview")
+        # ==============================
+        # KPI DASHBOARD
+        # ==============================
 
-    col1, col2, col3 = st.columns(3)
+        st.header("📊 Executive KPI Overview")
 
-    with col1:
-        st.metric(
-            label="Production Growth (7 Days)",
-            value=f"{result['trend_percent']}%",
-            delta=f"{result['trend_percent']}%"
-        )
+        col1, col2, col3 = st.columns(3)
 
-    with col2:
-        scrap = result["scrap_rate"]
-        st.metric(
-            label="Scrap Rate",
-            value=f"{scrap}%",
-            delta="Review Required" if scrap > 3.5 else "Stable"
-        )
+        with col1:
+            st.metric(
+                label=f"Production Growth ({config.ANALYST_WINDOW_DAYS} Days)",
+                value=f"{result['trend_percent']}%",
+                delta=f"{result['trend_percent']}%"
+            )
 
-    with col3:
-        roi_value = result.get("roi", {}).get("total_savings", 0)
-        st.metric(
-            label="AI Estimated Value Created",
-            value=f"${roi_value:,.2f}"
-        )
+        with col2:
+            scrap = result["scrap_rate"]
+            st.metric(
+                label="Scrap Rate",
+                value=f"{scrap}%",
+                delta="Review Required" if scrap > 3.5 else "Stable"
+            )
 
-    st.markdown("---")
+        with col3:
+            roi_value = result.get("roi", {}).get("total_savings", 0)
+            st.metric(
+                label="AI Estimated Value Created",
+                value=f"${roi_value:,.2f}"
+            )
 
-    # ==============================
-    # ANALYST OUTPUT
-    # ==============================
+        st.markdown("---")
 
-    st.header("🧠 Analyst Executive Summary")
-    st.markdown(result["analyst_summary"])
+        # ==============================
+        # ANALYST OUTPUT
+        # ==============================
 
-    st.markdown("---")
+        st.header("🧠 Analyst Executive Summary")
+        st.markdown(result["analyst_summary"])
 
-    # ==============================
-    # PROCUREMENT OUTPUT
-    # ==============================
+        st.markdown("---")
 
-    st.header("📦 Procurement Actions")
+        # ==============================
+        # PROCUREMENT OUTPUT
+        # ==============================
 
-    for vendor, email_text in result["procurement_output"].items():
-        with st.expander(f"View Purchase Order → {vendor}"):
-            st.markdown(email_text)
+        st.header("📦 Procurement Actions")
+        show_procurement(result["procurement_output"])
 
-    st.markdown("---")
+        st.markdown("---")
 
-    # ==============================
-    # LOGISTICS OUTPUT
-    # ==============================
+        # ==============================
+        # LOGISTICS OUTPUT
+        # ==============================
 
-    st.header("🚚 Logistics Risk Assessment")
-    st.markdown(result["logistics_output"])
+        st.header("🚚 Logistics Risk Assessment")
+        st.markdown(result["logistics_output"])
 
-    st.markdown("---")
+        st.markdown("---")
 
-    # ==============================
-    # ROI PANEL
-    # ==============================
+        # ==============================
+        # ROI PANEL
+        # ==============================
 
-    st.subheader("💰 Strategic Impact")
+        st.subheader("💰 Strategic Impact")
 
-    st.info(f"""
+        st.info(f"""
 AI-driven reorder adjustments and risk mitigation strategies optimized operational continuity.
 
 Estimated Value Created: **${roi_value:,.2f}**
-""")
\ No newline at end of file
+""")
+
+
+# ==============================
+# SYSTEM HEALTH
+# ==============================
+
+st.markdown("---")
+
+with st.expander("⚙️ System health (this dashboard process)"):
+    show_system_health()
@@ -0,0 +1,61 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import profiling
+import tracing
+
+
+def run_dag(nodes, max_workers=None):
+    """Run {name: (func, dependencies)} nodes as soon as their dependencies finish
+
+    Each func receives the dict of results produced so far and returns its own
+    result. Returns (results, timings) where timings holds per-node start/end
+    offsets in seconds from the start of the run.
+    """
+    for name, (_, deps) in nodes.items():
+        for dep in deps:
+            if dep not in nodes:
+                raise ValueError(f"Node '{name}' depends on unknown node '{dep}'")
+
+    results = {}
+    timings = {}
+    remaining = dict(nodes)
+    running = {}
+    run_start = time.perf_counter()
+
+    def execute(name, func):
+        start = time.perf_counter()
+        try:
+            with tracing.span(f"dag.{name}", {"dag.node": name}), profiling.profiled(name):
+                return func(results)
+        finally:
+            end = time.perf_counter()
+            timings[name] = {
+                "start_seconds": round(start - run_start, 4),
+                "end_seconds": round(end - run_start, 4),
+                "duration_seconds": round(end - start, 4)
+            }
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(nodes) or 1) as executor:
+        while remaining or running:
+            ready = [
+                name for name, (_, deps) in remaining.items()
+                if all(dep in results for dep in deps)
+            ]
+
+            for name in ready:
+                func, _ = remaining.pop(name)
+                running[executor.submit(tracing.propagate(execute), name, func)] = name
+
+            if not running:
+                raise ValueError(f"Dependency cycle between nodes: {sorted(remaining)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = running.pop(future)
+
+                # Fail fast: dependents of a failed node can never run
+                results[name] = future.result()
+
+    return results, timings
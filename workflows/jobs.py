@@ -0,0 +1,110 @@
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.analyst_agent import run_analysis_cycle
+from agents.procurement_agent import run_procurement_cycle
+from agents.logistics_agent import run_logistics_cycle
+from database import try_advisory_lock
+from live_output import LiveOutput
+from workflows.results_store import save_result
+from workflows.system_cycle import run_full_operations_cycle
+import tracing
+
+JOBS = {
+    "full_cycle": run_full_operations_cycle,
+    "analyst": run_analysis_cycle,
+    "procurement": run_procurement_cycle,
+    "logistics": run_logistics_cycle,
+}
+
+_executor = ThreadPoolExecutor(max_workers=len(JOBS), thread_name_prefix="cycle-job")
+_running = {}
+_running_lock = threading.Lock()
+
+
+def _record_failure(job_name, started_at, error):
+    try:
+        save_result(job_name, started_at, error=error)
+    except Exception as e:
+        print(f"Error recording {job_name} failure: {e}")
+
+
+def _run_job(job_name, live, lock):
+    started_at = datetime.datetime.now()
+    result, error, trace = None, None, None
+
+    try:
+        root = None
+
+        try:
+            with tracing.trace(f"job.{job_name}") as root:
+                result = JOBS[job_name](live=live)
+        except Exception as e:
+            print(f"Error running {job_name} job: {e}")
+            error = str(e) or type(e).__name__
+
+        if root is not None:
+            trace = tracing.waterfall(root.trace_id)
+
+        save_result(job_name, started_at, result=result, error=error, trace=trace)
+    except Exception as e:
+        # Nothing waits on the future, so anything that escapes here is
+        # recorded as a failed run rather than lost
+        print(f"Error finishing {job_name} job: {e}")
+        _record_failure(job_name, started_at, error or str(e) or type(e).__name__)
+    finally:
+        # Closing the dedicated connection releases the advisory lock
+        lock.close()
+        live.finish()
+
+        with _running_lock:
+            _running.pop(job_name, None)
+
+
+def start_job(job_name):
+    """Start job_name in the background
+
+    Returns "started", "running" if it is already running in this process,
+    "running_elsewhere" if another process holds its lock, or "failed" if
+    the lock could not be taken.
+    """
+    with _running_lock:
+        if job_name in _running:
+            return "running"
+
+        live = LiveOutput()
+        _running[job_name] = {"started_at": datetime.datetime.now(), "live": live}
+
+    # A session-level advisory lock extends single-flight across
+    # processes, e.g. several dashboard servers sharing one database
+    try:
+        lock = try_advisory_lock(f"cycle_job:{job_name}")
+    except Exception as e:
+        print(f"Error locking {job_name} job: {e}")
+        _record_failure(job_name, datetime.datetime.now(), f"Could not take the job lock: {e}")
+        lock, status = None, "failed"
+    else:
+        status = "started" if lock else "running_elsewhere"
+
+    if lock is None:
+        with _running_lock:
+            _running.pop(job_name, None)
+        return status
+
+    _executor.submit(_run_job, job_name, live, lock)
+    return status
+
+
+def running_jobs():
+    """{job_name: started_at} for jobs running in this process"""
+    with _running_lock:
+        return {job_name: job["started_at"] for job_name, job in _running.items()}
+
+
+def live_output(job_name):
+    """LiveOutput a running job streams its reports into, or None once it has finished"""
+    with _running_lock:
+        job = _running.get(job_name)
+
+    return job["live"] if job else None
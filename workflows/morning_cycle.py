@@ -1,36 +1,83 @@
 from workflows.system_cycle import run_full_operations_cycle
+from live_output import LiveOutput, section_title
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+import profiling
 
 
-def run_morning_cycle():
+def print_live_output(live):
+    """Print each streamed section as it is generated; returns the sections printed"""
+    printed = set()
+
+    for section in live.sections():
+        print(f"\n===== {section_title(section)} =====\n")
+
+        for chunk in live.follow(section):
+            print(chunk, end="", flush=True)
+
+        print()
+        printed.add(section)
+
+    return printed
+
+
+def run_morning_cycle(profile=None, profile_dir=None):
+    """Run and print the full cycle, optionally profiled (profile: both, cprofile or sampling)"""
+    if profile:
+        with profiling.session(profile, profile_dir):
+            return _run_morning_cycle()
+
+    return _run_morning_cycle()
+
+
+def _run_morning_cycle():
     print("\n=======================================")
     print("AI OPERATIONS MORNING CYCLE")
     print("Date:", datetime.date.today())
     print("=======================================\n")
 
-    # IMPORTANT: Actually call the system cycle
-    state = run_full_operations_cycle()
+    # IMPORTANT: Actually call the system cycle. It runs on a worker thread
+    # so reports print token by token while they are being generated.
+    live = LiveOutput()
 
-    print("\n===== EXECUTIVE SUMMARY =====\n")
-    print(state.get("analyst_summary"))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        cycle = executor.submit(run_full_operations_cycle, live)
+        printed = print_live_output(live)
+        state = cycle.result()
 
-    print("\n===== PROCUREMENT ACTIONS =====\n")
-    procurement_output = state.get("procurement_output", {})
+    # Anything that was not streamed (no LLM call was needed) prints here
+    if "analyst_summary" not in printed:
+        print("\n===== EXECUTIVE SUMMARY =====\n")
+        print(state.get("analyst_summary"))
 
-    if not procurement_output:
-        print("No procurement actions required.")
-    else:
-        for vendor, email in procurement_output.items():
-            print(f"\n--- {vendor} ---\n")
-            print(email)
+    if not any(section.startswith("procurement/") for section in printed):
+        print("\n===== PROCUREMENT ACTIONS =====\n")
+        procurement_output = state.get("procurement_output", {})
 
-    print("\n===== LOGISTICS REPORT =====\n")
-    print(state.get("logistics_output"))
+        if not procurement_output:
+            print("No procurement actions required.")
+        else:
+            for vendor, email in procurement_output.items():
+                print(f"\n--- {vendor} ---\n")
+                print(email)
+
+    if "logistics_report" not in printed:
+        print("\n===== LOGISTICS REPORT =====\n")
+        print(state.get("logistics_output"))
 
     print("\n===== ROI ESTIMATION =====\n")
     roi = state.get("roi", {})
     print(f"Estimated Total Value Created: ${roi.get('total_savings', 0):,.2f}")
 
+    print("\n===== CYCLE TIMINGS =====\n")
+    for node, timing in state.get("node_timings", {}).items():
+        print(f"{node:<12} {timing['start_seconds']:>8.2f}s -> {timing['end_seconds']:>8.2f}s "
+              f"({timing['duration_seconds']:.2f}s)")
+    print(f"Total cycle time: {state.get('cycle_seconds', 0):.2f}s")
+
+    if state.get("trace_file"):
+        print(f"Trace written to {state['trace_file']}")
+
     print("\n=======================================\n")
 
 
@@ -0,0 +1,12 @@
+from tools.outbox import run_outbox_worker
+import metrics
+
+
+if __name__ == "__main__":
+    print("Email outbox worker started. Press Ctrl+C to stop.")
+    metrics.start_http_server()
+
+    try:
+        run_outbox_worker()
+    except KeyboardInterrupt:
+        print("Email outbox worker stopped.")
@@ -0,0 +1,108 @@
+import json
+import math
+
+from psycopg2.extras import Json
+
+from database import db_connection, ensure_schema
+
+RESULTS_DDL = """
+    CREATE TABLE IF NOT EXISTS cycle_results (
+        result_id BIGSERIAL PRIMARY KEY,
+        job_name TEXT NOT NULL,
+        status TEXT NOT NULL,
+        result JSONB,
+        error TEXT,
+        started_at TIMESTAMP NOT NULL,
+        finished_at TIMESTAMP NOT NULL DEFAULT NOW()
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_cycle_results_latest
+        ON cycle_results (job_name, finished_at DESC);
+
+    ALTER TABLE cycle_results ADD COLUMN IF NOT EXISTS trace JSONB;
+"""
+
+
+def _json_default(value):
+    # Dates, Decimals and NumPy scalars all have a faithful str form
+    return str(value)
+
+
+def _finite(value):
+    # JSONB rejects NaN and Infinity, which json.dumps writes by default
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def _to_json(value):
+    return Json(_finite(value), dumps=lambda obj: json.dumps(obj, default=_json_default, allow_nan=False))
+
+
+def save_result(job_name, started_at, result=None, error=None, trace=None):
+    """Persist the outcome of one background run, with its tracing waterfall rows"""
+    ensure_schema("cycle_results", RESULTS_DDL)
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        try:
+            cur.execute("""
+                INSERT INTO cycle_results (job_name, status, result, error, started_at, trace)
+                VALUES (%s, %s, %s, %s, %s, %s);
+            """, (
+                job_name,
+                "FAILED" if error else "COMPLETED",
+                _to_json(result),
+                error,
+                started_at,
+                _to_json(trace)
+            ))
+            conn.commit()
+        except Exception as e:
+            print(f"Error saving {job_name} result: {e}")
+            conn.rollback()
+        finally:
+            cur.close()
+
+
+def load_latest_result(job_name):
+    """Latest completed result for a job as (result, finished_at, trace), or Nones"""
+    ensure_schema("cycle_results", RESULTS_DDL)
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT result, finished_at, trace
+            FROM cycle_results
+            WHERE job_name = %s AND status = 'COMPLETED'
+            ORDER BY finished_at DESC
+            LIMIT 1;
+        """, (job_name,))
+        row = cur.fetchone()
+        cur.close()
+
+    return tuple(row) if row else (None, None, None)
+
+
+def load_latest_failure(job_name):
+    """Error message and time of the latest failed run, or (None, None)"""
+    ensure_schema("cycle_results", RESULTS_DDL)
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT error, finished_at
+            FROM cycle_results
+            WHERE job_name = %s AND status = 'FAILED'
+            ORDER BY finished_at DESC
+            LIMIT 1;
+        """, (job_name,))
+        row = cur.fetchone()
+        cur.close()
+
+    return (row[0], row[1]) if row else (None, None)
@@ -1,13 +1,56 @@
+import time
+
 from agents.analyst_agent import run_analysis_cycle
 from agents.procurement_agent import run_procurement_cycle
 from agents.logistics_agent import run_logistics_cycle
+from workflows.dag import run_dag
+import audit_log
+import config
+import metrics
+import tracing
+
+
+def _procurement_node(results, live=None):
+    # Procurement only needs the analyst's trend signal
+    analyst_output = results["analyst"]
+    trend_percent = analyst_output["trend_percent"] if analyst_output else 0
+
+    return run_procurement_cycle(trend_percent=trend_percent, live=live)
+
+
+def _logistics_node(results, live=None):
+    scan_stats = {} if config.LOGISTICS_SCAN_STATS else None
+    report = run_logistics_cycle(scan_stats=scan_stats, live=live)
 
+    return {"report": report, "scan_stats": scan_stats}
 
-def run_full_operations_cycle():
+
+def cycle_nodes(live=None):
+    """DAG nodes for the full cycle; with live set, generators stream into it"""
+    return {
+        "analyst": (lambda results: run_analysis_cycle(live=live), []),
+        "procurement": (lambda results: _procurement_node(results, live), ["analyst"]),
+        "logistics": (lambda results: _logistics_node(results, live), []),
+    }
+
+
+@metrics.timed_cycle("operations_cycle")
+def run_full_operations_cycle(live=None):
     system_state = {}
 
-    # Step 1: Analyst
-    analyst_output = run_analysis_cycle()
+    # Logistics runs alongside Analyst -> Procurement, so wall-clock time
+    # is the longer of the two branches rather than the sum of all three
+    cycle_start = time.perf_counter()
+    with tracing.trace("operations_cycle") as root:
+        try:
+            results, timings = run_dag(cycle_nodes(live))
+        finally:
+            audit_log.flush()
+
+            if live is not None:
+                live.finish()
+
+    analyst_output = results["analyst"]
 
     if analyst_output:
         system_state["trend_percent"] = analyst_output["trend_percent"]
@@ -16,15 +59,13 @@ def run_full_operations_cycle():
     else:
         system_state["trend_percent"] = 0
 
-    # Step 2: Procurement reacts to trend
-    procurement_output = run_procurement_cycle(
-        trend_percent=system_state["trend_percent"]
-    )
-
-    system_state["procurement_output"] = procurement_output
+    system_state["procurement_output"] = results["procurement"]
+    system_state["logistics_output"] = results["logistics"]["report"]
+    system_state["logistics_scan"] = results["logistics"]["scan_stats"]
 
-    # Step 3: Logistics check
-    logistics_output = run_logistics_cycle()
-    system_state["logistics_output"] = logistics_output
+    system_state["node_timings"] = timings
+    system_state["cycle_seconds"] = round(time.perf_counter() - cycle_start, 4)
+    system_state["trace_id"] = root.trace_id
+    system_state["trace_file"] = root.export_path
 
-    return system_state
\ No newline at end of file
+    return system_state